@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 # coding=utf-8
 
+import os
+import re
+import gzip
 import json
+import time
 import codecs
-from xml.dom import minidom
-from functools import lru_cache
+import asyncio
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import accumulate
+from weakref import WeakValueDictionary
+from xml.etree import ElementTree
 
-from abvd.tools import slugify
+from abvd.tools import parse_cognacy, slugify
+from abvd.cache import DiskCache
+from abvd import instrument
+from abvd import packed
 
 import httpx
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 URL = "https://abvd.eva.mpg.de/utils/save/?type=xml&section=%(db)s&language=%(id)d"
 
@@ -20,6 +39,18 @@ XMLTEMPLATE = """
 </abvd>
 """.lstrip().rstrip()
 
+CHUNKSIZE = 64 * 1024
+
+TIMEOUT = 60
+
+DETAILS_HEADER = [
+    "ID", "ISO", "Glottocode", "Language", "Slug", "NLexemes",
+    "NCognates", "Author", "Latitude", "Longitude", "Classification"
+]
+
+# rows to buffer before each write in `save_details`.
+DETAILS_BATCH = 1000
+
 DATABASES = [
     'austronesian',
     'bantu',
@@ -38,6 +69,20 @@ DEAD_LANGUAGES = {
 }
 
 
+def read_json(filename):
+    """Reads a JSON file, with orjson if it is installed."""
+    with open(filename, 'rb') as handle:
+        content = handle.read()
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content.decode('utf8'))
+
+
+def to_json(content):
+    """Serialises parsed entities the way they are saved to disk."""
+    return json.dumps(content, sort_keys=True, indent=2, ensure_ascii=False)
+
+
 class DeadLanguageError(ValueError):
     pass
 
@@ -46,19 +91,92 @@ class InvalidLanguageError(ValueError):
     pass
 
 
+class Language(object):
+    """
+    A language, shared by all of its Records so its taxon label is only
+    built once. Use `get_language` to get the shared instance.
+    """
+    __slots__ = ('LID', 'Name', '_taxon', '__weakref__')
+
+    def __init__(self, LID=None, Name=None):
+        self.LID = LID
+        self.Name = Name
+        self._taxon = None
+
+    def __repr__(self):
+        return "<Language %s - %s>" % (self.LID, self.Name)
+
+    def __eq__(self, other):
+        if not isinstance(other, Language):
+            return NotImplemented
+        return (self.LID, self.Name) == (other.LID, other.Name)
+
+    def __hash__(self):
+        return hash((self.LID, self.Name))
+
+    @property
+    def taxon(self):
+        if self._taxon is None:
+            if self.LID is None:
+                self._taxon = self.Name
+            else:
+                self._taxon = "%s_%d" % (slugify(self.Name), self.LID)
+        return self._taxon
+
+
+# the Language for each (LID, name) that is still referenced by a Record.
+_LANGUAGES = WeakValueDictionary()
+
+
+def get_language(lid, name):
+    """Returns the shared Language for `lid` and `name`."""
+    try:
+        return _LANGUAGES[(lid, name)]
+    except KeyError:
+        language = _LANGUAGES[(lid, name)] = Language(lid, name)
+        return language
+
+
 class Record(object):
-    """Data Class for Lexical Records."""
-    def __init__(self, ID=None, LID=None, WID=None, Language=None, Word=None, Item=None, Annotation=None, Loan=None, Cognacy=None):
+    """
+    Data Class for Lexical Records.
+
+    `LID` and `Language` are read from the shared `language` object, which
+    is looked up from them unless given.
+    """
+    __slots__ = (
+        'ID', 'WID', 'language', 'Word', 'Item', 'Annotation', 'Loan', 'Cognacy'
+    )
+    fields = (
+        'ID', 'LID', 'WID', 'Language', 'Word', 'Item', 'Annotation', 'Loan', 'Cognacy'
+    )
+
+    def __init__(self, ID=None, LID=None, WID=None, Language=None, Word=None, Item=None, Annotation=None, Loan=None, Cognacy=None, language=None):
         self.ID = ID
-        self.LID = LID
         self.WID = WID
-        self.Language = Language
+        self.language = get_language(LID, Language) if language is None else language
         self.Word = Word
         self.Item = Item
         self.Annotation = Annotation
         self.Loan = Loan
         self.Cognacy = Cognacy
 
+    @property
+    def LID(self):
+        return self.language.LID
+
+    @LID.setter
+    def LID(self, value):
+        self.language = get_language(value, self.language.Name)
+
+    @property
+    def Language(self):
+        return self.language.Name
+
+    @Language.setter
+    def Language(self, value):
+        self.language = get_language(self.language.LID, value)
+
     def __repr__(self):
         return "<Record %s - %s - %s - %s>" % (
             self.ID, self.Language, self.Word, self.Item
@@ -77,22 +195,210 @@ class Record(object):
             return True
 
     def get_taxon(self):
-        if self.LID is None:
-            return self.Language
+        return self.language.taxon
+
+
+class _StringPool(object):
+    """Interns strings, handing out an integer index for each."""
+    def __init__(self):
+        self.strings = [None]
+        self.index = {None: 0}
+
+    def add(self, value):
+        try:
+            return self.index[value]
+        except KeyError:
+            self.index[value] = len(self.strings)
+            self.strings.append(value)
+            return self.index[value]
+
+
+class RecordTable(object):
+    """
+    Column-oriented store of Records.
+
+    Identifiers are held in arrays and strings are interned in a pool that
+    can be shared between tables. Iterating or indexing a table gives
+    `Record`s built on the fly.
+    """
+    NULL = -2 ** 63  # stands in for an identifier of None.
+    integers = ('ID', 'LID', 'WID')
+    strings = ('Language', 'Word', 'Item', 'Annotation', 'Loan', 'Cognacy')
+
+    def __init__(self, records=None, pool=None):
+        self.pool = _StringPool() if pool is None else pool
+        self.columns = {k: array('q') for k in self.integers}
+        self.columns.update({k: array('L') for k in self.strings})
+        if records is not None:
+            self.extend(records)
+
+    def __len__(self):
+        return len(self.columns['ID'])
+
+    def __repr__(self):
+        return "<RecordTable %d records>" % len(self)
+
+    def append(self, record):
+        for k in self.integers:
+            v = getattr(record, k)
+            self.columns[k].append(self.NULL if v is None else v)
+        for k in self.strings:
+            self.columns[k].append(self.pool.add(getattr(record, k)))
+
+    def extend(self, records):
+        if isinstance(records, RecordTable) and records.pool is self.pool:
+            for k in self.columns:
+                self.columns[k].extend(records.columns[k])
         else:
-            return "%s_%d" % (slugify(self.Language), self.LID)
+            for r in records:
+                self.append(r)
+
+    def __getitem__(self, index):
+        values = {}
+        for k in self.integers:
+            v = self.columns[k][index]
+            values[k] = None if v == self.NULL else v
+        for k in self.strings:
+            values[k] = self.pool.strings[self.columns[k][index]]
+        return Record(**values)
+
+    def __iter__(self):
+        strings = self.pool.strings
+        null = self.NULL
+        columns = [self.columns[k] for k in self.integers + self.strings]
+        languages = {}
+        for ID, LID, WID, lang, word, item, annot, loan, cog in zip(*columns):
+            if (LID, lang) not in languages:
+                languages[(LID, lang)] = get_language(None if LID == null else LID, strings[lang])
+            yield Record(
+                ID=None if ID == null else ID,
+                WID=None if WID == null else WID,
+                language=languages[(LID, lang)],
+                Word=strings[word],
+                Item=strings[item],
+                Annotation=strings[annot],
+                Loan=strings[loan],
+                Cognacy=strings[cog],
+            )
+
+
+class RecordView(Sequence):
+    """
+    Read-only sequence of the records of several files, in order, built from
+    their lexicons without copying them. Files can be set or removed in
+    time proportional to that file.
+
+    Unlike a list it can't be sorted or appended to in place: use
+    `list(view)` (or `view + [...]`, which returns a list) for that.
+    """
+    def __init__(self):
+        self.lexicons = OrderedDict()
+        self._tables = None
+        self._offsets = None
+
+    def set(self, filename, records):
+        self.lexicons[filename] = records
+        self._tables = self._offsets = None
+
+    def remove(self, filename):
+        if self.lexicons.pop(filename, None) is not None:
+            self._tables = self._offsets = None
 
+    def _build(self):
+        """Caches the lexicons and their cumulative lengths until a file changes."""
+        if self._offsets is None:
+            self._tables = list(self.lexicons.values())
+            self._offsets = list(accumulate(len(r) for r in self._tables))
+
+    def __len__(self):
+        self._build()
+        return self._offsets[-1] if self._offsets else 0
+
+    def __repr__(self):
+        return "<RecordView %d records in %d files>" % (len(self), len(self.lexicons))
+
+    def __iter__(self):
+        for records in self.lexicons.values():
+            yield from records
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        total = len(self)
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError("record index out of range")
+        i = bisect_right(self._offsets, index)
+        return self._tables[i][index - self._offsets[i - 1] if i else index]
+
+
+class _LazyLexicon(Sequence):
+    """
+    The records of a lazily loaded file in a RecordView, read through the
+    database each time so they can be dropped under `max_resident`.
+    """
+    def __init__(self, db, filename):
+        self.db = db
+        self.filename = filename
+        self.length = db.stats(filename)['nlexemes']
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.db._lexicon(self.filename)[index]
+
+    def __iter__(self):
+        return iter(self.db._lexicon(self.filename))
 
 
 class Downloader(object):
     
     databases = DATABASES
     
-    def __init__(self, database, url=URL):
+    def __init__(self, database, url=URL, cache=None, max_age=None, max_size=None, eviction='lru', transport=None):
+        """
+        `cache` is a directory (or DiskCache) to keep downloaded XML in
+        between runs, with `max_age`, `max_size` and `eviction` configuring
+        the DiskCache when a directory is given.
+
+        `transport` is an optional httpx transport to send requests through.
+        """
         if database not in self.databases:
             raise ValueError("Unknown Database: %s" % database)
         self.database = database
-        self.url = URL
+        self.url = url
+        if cache is not None and not isinstance(cache, DiskCache):
+            cache = DiskCache(cache, max_age=max_age, max_size=max_size, eviction=eviction)
+        self.cache = cache
+        self.transport = transport
+        self._client = None
+
+    @property
+    def client(self):
+        """A pooled httpx.Client so repeated requests reuse connections."""
+        if self._client is None:
+            self._client = httpx.Client(transport=self.transport, timeout=TIMEOUT)
+        return self._client
+
+    def close(self):
+        """Closes the pooled client, if one was opened."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
         
     def make_url(self, language_id):
         try:
@@ -101,29 +407,101 @@ class Downloader(object):
             raise TypeError("language_id needs to be an integer")
         
         return self.url % {'db': self.database, 'id': language_id}
-    
-    @lru_cache(maxsize=2000)
-    def get(self, language_id, raw=False):  # pragma: no cover
-        language_id = self.is_valid_language(language_id)
-        req = httpx.get(self.make_url(language_id))
-        
+
+    def get_cached(self, language_id):
+        """
+        Returns (content, headers) where content is the cached XML if it can
+        be used as-is (or None), and headers are the conditional request
+        headers needed to revalidate any stale copy.
+        """
+        if self.cache is None:
+            return None, {}
+        entry = self.cache.get(self.database, language_id)
+        if entry is None:
+            return None, {}
+        if self.cache.is_fresh(entry):
+            return entry['content'], {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return None, headers
+
+    def handle_response(self, language_id, response):
+        """Checks and decodes `response`, updating the cache."""
+        instrument.count('download.requests')
+        instrument.count('download.bytes', len(response.content))
+        if response.status_code == 304 and self.cache is not None:
+            entry = self.cache.get(self.database, language_id)
+            if entry is not None:
+                self.cache.touch(self.database, language_id)
+                return entry['content']
+        # don't decode (or cache) error pages as languages.
+        if response.status_code != 200:
+            response.raise_for_status()
+
         # fail on no content
-        if len(req.content) == 0 or req.content.strip() == 'null':
+        if len(response.content) == 0 or response.content.strip() == b'null':
             raise InvalidLanguageError("Language %d does not exist" % language_id)
-        
-        try:
-            content = req.content.decode('utf8')
-        except:
-            raise
+
+        content = response.content.decode('utf8')
+        if self.cache is not None and response.status_code == 200:
+            self.cache.put(
+                self.database, language_id, content,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'),
+            )
+        return content
+
+    def get(self, language_id, raw=False):
+        language_id = self.is_valid_language(language_id)
+        content, headers = self.get_cached(language_id)
+        if content is None:
+            with instrument.timer('download.request'):
+                req = self.client.get(self.make_url(language_id), headers=headers)
+            content = self.handle_response(language_id, req)
+        else:
+            instrument.count('download.cache_hits')
 
         if raw:
             return content
         else:
             return Parser().parse(content)
+
+    def get_many(self, language_ids, raw=False, concurrency=10, return_exceptions=False):
+        """
+        Fetches many languages concurrently, returning a dictionary of
+        {language_id: content}. See `AsyncDownloader.get_many`.
+
+        This runs its own event loop, so inside a running one (e.g. Jupyter)
+        `await AsyncDownloader(...).get_many(...)` instead.
+        """
+        if self.transport is not None and not isinstance(self.transport, httpx.AsyncBaseTransport):
+            raise TypeError(
+                "get_many needs an async transport (e.g. httpx.AsyncHTTPTransport), not %s"
+                % type(self.transport).__name__
+            )
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "get_many cannot be called from a running event loop, "
+                "await AsyncDownloader.get_many instead"
+            )
+        downloader = AsyncDownloader(
+            self.database, url=self.url, cache=self.cache,
+            concurrency=concurrency, transport=self.transport
+        )
+        return asyncio.run(
+            downloader.get_many(language_ids, raw=raw, return_exceptions=return_exceptions)
+        )
     
     def write(self, filename, content=None, xml=None):  # pragma: no cover
         if content:
-            out = json.dumps(content, sort_keys=True, indent=2, ensure_ascii=False)
+            out = to_json(content)
         elif xml:
             out = xml
         else:
@@ -143,68 +521,316 @@ class Downloader(object):
         self.write(filename, self.get(language_id, raw=raw))
 
 
+class AsyncDownloader(Downloader):
+    """
+    Downloader that fetches many languages at once over a single pool of
+    connections, with at most `concurrency` requests in flight.
+
+    `transport` must be an async httpx transport if given.
+    """
+    def __init__(self, database, url=URL, cache=None, max_age=None, max_size=None, eviction='lru', transport=None, concurrency=10):
+        super().__init__(
+            database, url=url, cache=cache, max_age=max_age, max_size=max_size,
+            eviction=eviction, transport=transport
+        )
+        self.concurrency = concurrency
+
+    def make_client(self):
+        return httpx.AsyncClient(
+            default_encoding="utf-8",
+            limits=httpx.Limits(
+                max_keepalive_connections=self.concurrency,
+                max_connections=self.concurrency
+            ),
+            transport=self.transport,
+            timeout=TIMEOUT
+        )
+
+    async def fetch(self, client, language_id, raw=False):
+        language_id = self.is_valid_language(language_id)
+        content, headers = self.get_cached(language_id)
+        if content is None:
+            with instrument.timer('download.request'):
+                response = await client.get(self.make_url(language_id), headers=headers)
+            content = self.handle_response(language_id, response)
+        else:
+            instrument.count('download.cache_hits')
+
+        if raw:
+            return content
+        else:
+            return Parser().parse(content)
+
+    async def get_many(self, language_ids, raw=False, return_exceptions=False):
+        """
+        Fetches `language_ids`, returning a dictionary of {language_id:
+        content} in the order given, where content is the parsed entities,
+        or the XML if `raw`.
+
+        Errors for any language (e.g. InvalidLanguageError, DeadLanguageError)
+        are raised unless `return_exceptions`, when they are returned as that
+        language's content instead.
+        """
+        language_ids = list(language_ids)
+        pending = iter(language_ids)
+        results, failures = {}, []
+
+        async def worker(client):
+            for language_id in pending:
+                if failures:
+                    break
+                try:
+                    results[language_id] = await self.fetch(client, language_id, raw=raw)
+                except Exception as e:
+                    if not return_exceptions:
+                        failures.append(e)
+                        break
+                    results[language_id] = e
+
+        async with self.make_client() as client:
+            nworkers = max(1, min(self.concurrency, len(language_ids)))
+            await asyncio.gather(*[worker(client) for _ in range(nworkers)])
+
+        if failures:
+            raise failures[0]
+        return {language_id: results[language_id] for language_id in language_ids}
+
+
+class _RecordBuilder(object):
+    """XMLParser target that turns each <record> into a dictionary."""
+    def __init__(self):
+        self.records = []
+        self.record = None
+        self.tag = None
+        self.text = None
+
+    def start(self, tag, attrib):
+        if tag == 'record':
+            self.record = {}
+        elif self.record is not None:
+            self.tag, self.text = tag, None
+
+    def data(self, data):
+        # text usually arrives in one piece, so concatenate rather than join.
+        if self.tag is not None:
+            self.text = data if self.text is None else self.text + data
+
+    def end(self, tag):
+        if tag == 'record':
+            self.records.append(self.record)
+            self.record = None
+        elif self.tag is not None:
+            assert tag not in self.record
+            # no data e.g. <x></x> is None
+            self.record[tag] = self.text
+            self.tag = None
+
+    def close(self):
+        pass
+
+    def flush(self):
+        records, self.records = self.records, []
+        return records
+
+
+def to_int(value):
+    """Converts an identifier to an int, leaving empty values as None."""
+    if value is None:
+        return None
+    value = value.strip()
+    return int(value) if value else None
+
+
+def to_float(value):
+    """Converts a coordinate to a float, leaving empty values as None."""
+    if value is None:
+        return None
+    value = value.strip()
+    return float(value) if value and value != '-' else None
+
+
+class Schema(object):
+    """
+    A kind of record: `kind` is what it is parsed as (language, lexicon or
+    location), `keys` the fields a record needs to be one, and `converters`
+    maps fields to functions converting them when parsing with typed=True.
+    """
+    def __init__(self, kind, keys, converters=None):
+        self.kind = kind
+        self.keys = frozenset(keys)
+        self.converters = converters or {}
+
+    def __repr__(self):
+        return "<Schema %s %s>" % (self.kind, sorted(self.keys))
+
+
+LANGUAGE_SCHEMA = Schema('language', [
+    'id', 'checkedby', 'language', 'classification', 'author',
+    'silcode', 'glottocode', 'notes', 'typedby', 'problems'
+], {'id': to_int})
+
+LEXICON_SCHEMA = Schema('lexicon', [
+    'id', 'word_id', 'word',
+    'item', 'annotation', 'loan', 'cognacy', 'pmpcognacy',
+], {'id': to_int, 'word_id': to_int})
+
+LEXICON_2_SCHEMA = Schema('lexicon', [
+    'id', 'word_id', 'word',
+    'source_id', 'source',
+    'item', 'annotation', 'loan', 'cognacy',
+], {'id': to_int, 'word_id': to_int, 'source_id': to_int})
+
+LOCATION_SCHEMA = Schema('location', [
+    'latitude', 'longitude'
+], {'latitude': to_float, 'longitude': to_float})
+
+
 class Parser(object):
+    """
+    Parses ABVD XML. Records are classified by the first schema in
+    `schemas` whose keys they have, and with `typed=True` their fields are
+    converted by that schema's converters (e.g. identifiers to ints).
+    """
+    schemas = [LANGUAGE_SCHEMA, LEXICON_SCHEMA, LEXICON_2_SCHEMA, LOCATION_SCHEMA]
+    # {class: (its schemas, {frozenset of a record's keys: its schema})},
+    # filled in as they are seen and redone if the schemas change.
+    _caches = {}
+
+    def __init__(self, typed=False):
+        self.typed = typed
+        cache = Parser._caches.get(type(self))
+        if cache is None or cache[0] is not self.schemas:
+            cache = Parser._caches[type(self)] = (self.schemas, {})
+        self._signatures = cache[1]
+
+    @classmethod
+    def register_schema(cls, kind, keys, converters=None, first=False):
+        """
+        Adds a schema for another kind of record, checked after the
+        existing ones unless `first` is set.
+        """
+        schema = Schema(kind, keys, converters)
+        cls.schemas = [schema] + cls.schemas if first else cls.schemas + [schema]
+        return schema
+
+    def get_schema(self, adict):
+        """Returns the schema for `adict`, or None if there is not one."""
+        signature = frozenset(adict)
+        try:
+            return self._signatures[signature]
+        except KeyError:
+            schema = next((s for s in self.schemas if s.keys <= signature), None)
+            # only keep a bounded number of unusual signatures.
+            if len(self._signatures) < 1000:
+                self._signatures[signature] = schema
+            return schema
+
     def is_language(self, adict):
-        expected = [
-            'id', 'checkedby', 'language', 'classification', 'author',
-            'silcode', 'glottocode', 'notes', 'typedby', 'problems'
-        ]
-        return all([e in adict.keys() for e in expected])
+        return LANGUAGE_SCHEMA.keys <= adict.keys()
 
     def is_lexicon(self, adict):
-        expected = [
-            'id', 'word_id', 'word',
-            'item', 'annotation', 'loan', 'cognacy', 'pmpcognacy',
-        ]
-        return all([e in adict.keys() for e in expected])
-    
+        return LEXICON_SCHEMA.keys <= adict.keys()
+
     def is_lexicon_2(self, adict):
-        expected = [
-            'id', 'word_id', 'word',
-            'source_id', 'source',
-            'item', 'annotation', 'loan', 'cognacy',
-        ]
-        return all([e in adict.keys() for e in expected])
-    
+        return LEXICON_2_SCHEMA.keys <= adict.keys()
+
     def is_location(self, adict):
-        expected = ['latitude', 'longitude']
-        return all([e in adict.keys() for e in expected])
+        return LOCATION_SCHEMA.keys <= adict.keys()
 
-    def parse(self, content):
-        if not content.startswith('<?xml version="1.0" encoding="utf-8"?>'):
-            content = XMLTEMPLATE % content
-        xml = minidom.parseString(content)
-        entities = {'language': None, 'lexicon': [], 'location': None}
-        for node in xml.getElementsByTagName('record'):
-            content = {}
-            for child in node.childNodes:
-                # skip text nodes (which are whitespace indentation)
-                if child.nodeType == child.TEXT_NODE:
+    def classify(self, adict):
+        """Returns the kind of record (language, lexicon, location) `adict` is."""
+        schema = self.get_schema(adict)
+        if schema is None:
+            raise ValueError("Unknown Record Type: %r" % adict)
+        return schema.kind
+
+    def convert(self, adict):
+        """Classifies `adict`, converting its fields if typed, as (kind, adict)."""
+        schema = self.get_schema(adict)
+        if schema is None:
+            raise ValueError("Unknown Record Type: %r" % adict)
+        if self.typed:
+            for key, converter in schema.converters.items():
+                if key in adict:
+                    adict[key] = converter(adict[key])
+        return schema.kind, adict
+
+    def _read(self, source):
+        """Yields chunks of XML from a string, a path, or a file-like object."""
+        if isinstance(source, (str, bytes)):
+            # fed in pieces too, so records are yielded as they are closed.
+            for start in range(0, len(source), CHUNKSIZE):
+                yield source[start:start + CHUNKSIZE]
+        elif isinstance(source, os.PathLike):
+            with open(source, 'rb') as handle:
+                yield from self._read(handle)
+        else:
+            while True:
+                chunk = source.read(CHUNKSIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def iterparse(self, source):
+        """
+        Incrementally parses `source` (a string, path or file-like object),
+        yielding (kind, record) tuples as soon as each record is closed.
+
+        Records are discarded once yielded so memory use does not grow with
+        the size of the document.
+        """
+        builder = _RecordBuilder()
+        parser = ElementTree.XMLParser(target=builder)
+        wrapped, closing = None, '</abvd>'
+        for chunk in self._read(source):
+            if wrapped is None:
+                head = chunk.lstrip()
+                if not head:
                     continue
+                wrapped = not head.startswith(
+                    b'<?xml' if isinstance(head, bytes) else '<?xml'
+                )
+                if wrapped:  # bare records from the server, so add a root.
+                    if isinstance(head, bytes):
+                        parser.feed(b'<abvd>')
+                        closing = b'</abvd>'
+                    else:
+                        parser.feed('<abvd>')
+            parser.feed(chunk)
+            for record in builder.flush():
+                yield self.convert(record)
 
-                tag = child.tagName
-                assert tag not in content
+        if wrapped is not False:
+            parser.feed(closing if wrapped else '<abvd></abvd>')
+        parser.close()
+        for record in builder.flush():
+            yield self.convert(record)
 
-                try:
-                    data = child.firstChild.data
-                except AttributeError:
-                    # no data e.g. <x></x>
-                    data = None
-
-                content[tag] = data
-            
-            if self.is_language(content):
+    def parse(self, content):
+        if instrument.enabled:
+            start = time.perf_counter()
+            entities = self._parse(content)
+            elapsed = time.perf_counter() - start
+            nrecords = len(entities['lexicon']) + 1 + (entities['location'] is not None)
+            instrument.observe('parse', elapsed)
+            instrument.observe('parse.per_record', elapsed / nrecords)
+            instrument.count('parse.records', nrecords)
+            return entities
+        return self._parse(content)
+
+    def _parse(self, content):
+        entities = {'language': None, 'lexicon': [], 'location': None}
+        for kind, record in self.iterparse(content):
+            if kind == 'language':
                 if entities['language'] is not None:
                     raise ValueError("Encountered Duplicate Language Record")
-                entities['language'] = content
-            elif self.is_lexicon(content):
-                entities['lexicon'].append(content)
-            elif self.is_lexicon_2(content):
-                entities['lexicon'].append(content)
-            elif self.is_location(content):
-                entities['location'] = content
-            else:
-                raise ValueError("Unknown Record Type: %r" % content)
+                entities['language'] = record
+            elif kind == 'lexicon':
+                entities['lexicon'].append(record)
+            elif kind == 'location':
+                entities['location'] = record
+            else:  # kinds added with `register_schema`
+                entities.setdefault(kind, []).append(record)
 
         # check
         if entities['language'] is None:
@@ -215,20 +841,263 @@ class Parser(object):
         return entities
 
 
+_LANGUAGE_KEY = re.compile(r'\s*\{\s*"language"\s*:\s*')
+_LOCATION_KEY = re.compile(r'"location"\s*:\s*')
+
+
+def _read_file(filename, lazy=False):
+    """
+    Reads a JSON file (or its index if `lazy`) in a worker, returning
+    (filename, data, seconds, error).
+    """
+    start = time.perf_counter()
+    try:
+        if lazy:
+            data = ABVDatabase().read_index(filename)
+        else:
+            data = read_json(filename)
+    except Exception as e:
+        return filename, None, time.perf_counter() - start, "%s: %s" % (type(e).__name__, e)
+    return filename, data, time.perf_counter() - start, None
+
+
+def _file_stats(filename):
+    """Reads the statistics for one JSON file, in a worker process."""
+    db = ABVDatabase()
+    db.load(filename)
+    return db.stats(filename)
+
+
 class ABVDatabase(object):
-    def __init__(self, files=None):
+    def __init__(self, files=None, compact=False, lazy=False, max_resident=None, workers=None):
+        """
+        - `compact`: store records in RecordTables sharing one string pool.
+          The lexicon dictionaries of JSON files are released once their
+          records are built, and read from disk again if they are needed.
+        - `lazy`: only index the language and location of each file when
+          loading, and read lexicons from disk when they are needed.
+        - `max_resident`: the most lazily loaded lexicons to keep in memory.
+          The records from `process` are read on demand to respect it, but
+          the indexes from `build_index` keep every record in memory.
+        - `workers`: load `files` with `load_many` using this many processes,
+          which only pays off with several cores.
+        """
         self.files = {}
-        self._lexicon_by_file = {}
+        self._lexicon_by_file = OrderedDict()
         self.records = None
+        self.compact = compact
+        self._strings = _StringPool()
+        self.lazy = lazy
+        self.max_resident = max_resident
+        self._lazy_files = set()
+        self._on_disk = set()
+        self._index = None
+        self._stats = {}
+        self._slugs = {}
         
-        if files:
+        if files and workers is not None and workers > 1:
+            self.load_many(files, workers=workers, executor='process')
+        elif files:
             for f in files:
                 self.load(f)
         
     def load(self, filename):
+        """
+        Loads (or reloads) a JSON file, updating the records from `process`
+        if they have been built.
+        """
+        with instrument.timer('load'):
+            self._store(filename, self.read_index(filename) if self.lazy else read_json(filename))
+        instrument.count('load.files')
+
+    def load_many(self, filenames, workers=None, executor=None, on_error='raise'):
+        """
+        Loads JSON files, adding them in the order given. They are decoded
+        here one at a time, or with `executor` "process" or "thread" in a
+        pool of `workers`. Pools only help with several cores and large
+        files (see benchmarks/bench_load.py), so they have to be asked for.
+
+        Files that cannot be read raise a ValueError, unless `on_error` is
+        "skip" when they are left out.
+
+        Returns a list of {'filename', 'seconds', 'error'} for each file.
+        """
+        if on_error not in ('raise', 'skip'):
+            raise ValueError("Unknown on_error: %s" % on_error)
+        if executor == 'process':
+            pool = ProcessPoolExecutor(max_workers=workers)
+        elif executor == 'thread':
+            pool = ThreadPoolExecutor(max_workers=workers)
+        elif executor is None:
+            pool = None
+        else:
+            raise ValueError("Unknown executor: %s" % executor)
+
+        filenames = list(filenames)
+        lazy = [self.lazy] * len(filenames)
+        if pool is None:
+            return self._add_files(map(_read_file, filenames, lazy), on_error)
+        with pool:
+            chunksize = max(1, len(filenames) // (4 * (workers or os.cpu_count() or 1)))
+            return self._add_files(pool.map(_read_file, filenames, lazy, chunksize=chunksize), on_error)
+
+    def _add_files(self, results, on_error):
+        """Stores the files read by `_read_file`, returning the `load_many` report."""
+        report = []
+        for filename, data, seconds, error in results:
+            report.append({'filename': filename, 'seconds': seconds, 'error': error})
+            instrument.observe('load', seconds)
+            if error is not None:
+                if on_error == 'raise':
+                    raise ValueError("Could not load %s: %s" % (filename, error))
+                continue
+            self._store(filename, data)
+            instrument.count('load.files')
+        return report
+
+    def _store(self, filename, data):
+        """Adds the decoded contents (or index, if lazy) of a file."""
+        self.files[filename] = data
+        self._on_disk.add(filename)
+        if self.lazy:
+            self._lazy_files.add(filename)
+        else:
+            self._lazy_files.discard(filename)
+        self._loaded(filename)
+
+    def unload(self, filename):
+        """Removes a loaded file and its records."""
+        del self.files[filename]
+        self._lazy_files.discard(filename)
+        self._on_disk.discard(filename)
+        self._lexicon_by_file.pop(filename, None)
+        self._stats.pop(filename, None)
+        self._index = None
+        if self.records is not None:
+            self.records.remove(filename)
+
+    def _loaded(self, filename, records=None):
+        """Drops anything cached for a newly (re)loaded file."""
+        self._lexicon_by_file.pop(filename, None)
+        self._stats.pop(filename, None)
+        self._index = None
+        if records is not None:
+            self._lexicon_by_file[filename] = records
+        if self.records is not None:
+            self.records.set(filename, self._view(filename))
+
+    def read_index(self, filename):
+        """
+        Reads the language and location from a JSON file without decoding
+        the lexicon.
+        """
         with codecs.open(filename, 'r', encoding="utf8") as handle:
-            self.files[filename] = json.load(handle)
-    
+            content = handle.read()
+        # files are saved with sorted keys, so the language is first and
+        # the location last. Anything else is decoded in full.
+        decoder = json.JSONDecoder()
+        start = _LANGUAGE_KEY.match(content)
+        end = _LOCATION_KEY.match(content, max(content.rfind('"location"'), 0))
+        if start and end:
+            try:
+                language, _ = decoder.raw_decode(content, start.end())
+                location, idx = decoder.raw_decode(content, end.end())
+            except ValueError:
+                pass
+            else:
+                if content[idx:].strip() == '}':
+                    return {'language': language, 'location': location}
+        data = json.loads(content)
+        data.pop('lexicon', None)
+        return data
+
+    def read_lexicon(self, filename):
+        return read_json(filename)['lexicon']
+
+    def get_entries(self, filename):
+        """
+        Returns the lexicon for `filename` as dictionaries like those from
+        `Parser.parse`. Files loaded from XML are rebuilt from their records.
+        """
+        if 'lexicon' in self.files[filename]:
+            return self.files[filename]['lexicon']
+        elif filename in self._lazy_files:
+            return self.read_lexicon(filename)
+        return [
+            {
+                'id': '%d' % r.ID, 'word_id': '%d' % r.WID, 'word': r.Word,
+                'item': r.Item, 'annotation': r.Annotation, 'loan': r.Loan,
+                'cognacy': r.Cognacy,
+            } for r in self._lexicon(filename)
+        ]
+
+    def save_packed(self, filename):
+        """Saves all loaded files into a single packed corpus file."""
+        packed.write(filename, {
+            f: {
+                'language': {
+                    k: v for k, v in self.files[f]['language'].items() if k != 'filename'
+                },
+                'location': self.files[f]['location'],
+                'lexicon': self.get_entries(f),
+            } for f in self.files
+        })
+
+    @classmethod
+    def open_packed(cls, filename, **kwargs):
+        """
+        Opens a packed corpus file. Languages are decoded from the memory
+        mapped file only when used.
+        """
+        db = cls(**kwargs)
+        db.corpus = packed.PackedCorpus(filename)
+        db.files.update(db.corpus.entries())
+        return db
+
+    def load_xml(self, filename):
+        """
+        Loads the raw XML saved by `abvd_xml` straight into `Record`s,
+        without building the intermediate lexicon dictionaries.
+        """
+        language, location, pending, other = None, None, [], {}
+        with open(filename, 'rb') as handle:
+            for kind, record in Parser().iterparse(handle):
+                if kind == 'language':
+                    if language is not None:
+                        raise ValueError("Encountered Duplicate Language Record")
+                    language = record
+                    language['filename'] = filename
+                    shared = get_language(int(language['id']), language['language'])
+                    pending = [self.to_record(language, r, shared) for r in pending]
+                elif kind == 'location':
+                    location = record
+                elif kind != 'lexicon':  # kinds added with `register_schema`
+                    other.setdefault(kind, []).append(record)
+                elif language is None:
+                    pending.append(record)
+                else:
+                    pending.append(self.to_record(language, record, shared))
+
+        if language is None:
+            raise ValueError("No Language Record Found!")
+        if len(pending) == 0:
+            raise ValueError("No Lexical Records Found!")
+
+        self.files[filename] = dict(other, language=language, location=location)
+        self._lazy_files.discard(filename)
+        self._on_disk.discard(filename)
+        if self.compact:
+            pending = RecordTable(pending, pool=self._strings)
+        self._loaded(filename, pending)
+
+    @classmethod
+    def from_xml(cls, paths):
+        """Creates a database from a list of XML files."""
+        db = cls()
+        for p in paths:
+            db.load_xml(p)
+        return db
+
     def get_details(self, filename):
         d = self.files[filename].get('language')
         if d is None:
@@ -240,34 +1109,97 @@ class ABVDatabase(object):
         return self.files[filename]['location']
 
     def get_lexicon(self, filename):
-        if filename not in self._lexicon_by_file:
-            self._lexicon_by_file[filename] = []
-            d = self.get_details(filename)
-            for r in self.files[filename]['lexicon']:
-                self._lexicon_by_file[filename].append(self.to_record(d, r))
-        yield from self._lexicon_by_file[filename]
+        yield from self._lexicon(filename)
+
+    def _lexicon(self, filename):
+        """Returns the (cached) records for `filename`."""
+        if filename in self._lexicon_by_file:
+            self._lexicon_by_file.move_to_end(filename)
+            return self._lexicon_by_file[filename]
+
+        lexicon = self.get_entries(filename)
+
+        if self.compact:
+            records = RecordTable(pool=self._strings)
+        else:
+            records = []
+        d = self.get_details(filename)
+        language = get_language(int(d['id']), d['language'])
+        for r in lexicon:
+            records.append(self.to_record(d, r, language))
+        if self.compact and filename in self._on_disk and filename not in self._lazy_files:
+            # the records replace the decoded lexicon, which is read back
+            # from disk like a lazy file's if it is needed.
+            del self.files[filename]['lexicon']
+            self._lazy_files.add(filename)
+        self._lexicon_by_file[filename] = records
+        self._evict()
+        return records
+
+    def _view(self, filename):
+        """The records of `filename` for `process`, read on demand if they can be evicted."""
+        if self.max_resident is not None and filename in self._lazy_files:
+            return _LazyLexicon(self, filename)
+        return self._lexicon(filename)
+
+    def _evict(self):
+        """Drops the least recently used lazy lexicons over `max_resident`."""
+        if self.max_resident is None:
+            return
+        resident = [f for f in self._lexicon_by_file if f in self._lazy_files]
+        for filename in resident[:max(0, len(resident) - self.max_resident)]:
+            del self._lexicon_by_file[filename]
         
-    @lru_cache(maxsize=2000)
+    def stats(self, filename):
+        """
+        Returns the statistics for `filename`, computed in one pass over its
+        lexicon and kept until the file is reloaded:
+
+        - `nlexemes`: the number of lexemes.
+        - `ncognates`: the number of lexemes with a cognacy coding.
+        - `nloans`: the number of lexemes marked as loans.
+        - `coverage`: {word id: number of lexemes} for each meaning.
+        """
+        if filename not in self._stats:
+            nlexemes, ncognates, nloans, coverage = 0, 0, 0, {}
+            for r in self._lexicon(filename):
+                nlexemes += 1
+                if r.Cognacy is not None:
+                    ncognates += 1
+                if r.is_loan:
+                    nloans += 1
+                coverage[r.WID] = coverage.get(r.WID, 0) + 1
+            self._stats[filename] = {
+                'nlexemes': nlexemes,
+                'ncognates': ncognates,
+                'nloans': nloans,
+                'coverage': coverage,
+            }
+        return self._stats[filename]
+
     def get_nlexemes(self, filename):
-        return len(list(self.get_lexicon(filename)))
+        return self.stats(filename)['nlexemes']
 
-    @lru_cache(maxsize=2000)
     def get_ncognates(self, filename):
-        return len([
-            r for r in self.get_lexicon(filename)
-            if r.Cognacy is not None
-        ])
+        return self.stats(filename)['ncognates']
     
-    @lru_cache(maxsize=2000)
     def get_slug_for(self, taxon, id):
-        return "%s_%s" % (slugify(taxon), id)
+        key = (taxon, id)
+        if key not in self._slugs:
+            self._slugs[key] = "%s_%s" % (slugify(taxon), id)
+        return self._slugs[key]
     
-    def to_record(self, details, entry):
+    def to_record(self, details, entry, language=None):
+        """
+        Builds a Record for `entry`, sharing `language` (the Language for
+        `details`) if it is given.
+        """
+        if language is None:
+            language = get_language(int(details['id']), details['language'])
         return Record(
-            LID=int(details['id']),
             ID=int(entry['id']),
             WID=int(entry['word_id']),
-            Language=details['language'],
+            language=language,
             Word=entry['word'],
             Item=entry['item'],
             Annotation=entry['annotation'],
@@ -276,53 +1208,143 @@ class ABVDatabase(object):
         )
     
     def process(self):
-        if not self.records:
-            self.records = []
-            for filename in self.files:
-                d = self.get_details(filename)
-                self.records.extend(self.get_lexicon(filename))
+        """
+        Returns a RecordView of the records of every loaded file, which is
+        kept up to date as files are loaded and unloaded.
+        """
+        if self.records is None:
+            with instrument.timer('process'):
+                self.records = RecordView()
+                for filename in self.files:
+                    with instrument.timer('process.file'):
+                        self.records.set(filename, self._view(filename))
         return self.records
     
-    def save_details(self, filename):
+    def build_index(self):
+        """
+        Builds (once) the indexes for `by_word`, `cognate_set`, `by_language`
+        and `by_glottocode`. These hold every record, so `max_resident` no
+        longer limits memory once they are built.
+        """
+        if self._index is not None:
+            return self._index
+        index = {'word': {}, 'cognate': {}, 'language': {}, 'glottocode': {}}
+        for filename in self.files:
+            d = self.get_details(filename)
+            glottocode = (d.get('glottocode') or '').strip()
+            if glottocode:
+                index['glottocode'].setdefault(glottocode, []).append(int(d['id']))
+            for r in self._lexicon(filename):
+                index['word'].setdefault(r.WID, []).append(r)
+                index['language'].setdefault(r.LID, []).append(r)
+                for cognate, _ in parse_cognacy(r.Cognacy):
+                    index['cognate'].setdefault((r.WID, cognate), []).append(r)
+        self._index = index
+        return index
+
+    def by_word(self, wid):
+        """Returns all records for the word (meaning) `wid`."""
+        return list(self.build_index()['word'].get(wid, []))
+
+    def cognate_set(self, wid, cognate):
+        """
+        Returns all records for word `wid` coded as cognate set `cognate`,
+        including uncertain codings (e.g. "2?").
+        """
+        return list(self.build_index()['cognate'].get((wid, str(cognate)), []))
+
+    def by_language(self, lid):
+        """Returns all records for the language `lid`."""
+        return list(self.build_index()['language'].get(lid, []))
+
+    def by_glottocode(self, glottocode):
+        """Returns the LIDs of the languages with `glottocode`."""
+        return list(self.build_index()['glottocode'].get(glottocode, []))
+
+    def get_details_row(self, filename):
+        """
+        Returns the `save_details` row for `filename`, raising a ValueError
+        if any value contains a tab or is missing.
+        """
         def denone(v):
             return '' if v is None else v
 
-        def check_tabs(v):
-            assert "\t" not in v
-
         def fmt_loc(v):
             return "%0.4f" % float(v) if v != '-' else v
-        
-        with codecs.open(filename, 'w', encoding="utf8") as out:
-            out.write("\t".join([
-                "ID", "ISO", "Glottocode", "Language", "Slug", "NLexemes",
-                "NCognates","Author", "Latitude", "Longitude", "Classification"
-            ]))
-            out.write("\n")
+
+        lang = self.get_details(filename)
+        loc = self.get_location(filename)
+        loc = {'longitude': '-', 'latitude': '-'} if loc is None else loc
+        stats = self.stats(filename)
+        try:
+            line = [
+                lang['id'],
+                denone(lang['silcode']).strip(),
+                denone(lang['glottocode']).strip(),
+                lang['language'].strip(),
+                self.get_slug_for(lang['language'], lang['id']),
+                '%d' % stats['nlexemes'],
+                '%d' % stats['ncognates'],
+                denone(lang['author']).strip(),
+                fmt_loc(loc['latitude']),
+                fmt_loc(loc['longitude']),
+                denone(lang['classification']).strip(),
+            ]
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError("Invalid details for %s: %r" % (filename, e))
+        for v in line:
+            if not isinstance(v, str) or "\t" in v:
+                raise ValueError("Invalid value for %s: %r" % (filename, v))
+        return line
+
+    def save_details(self, filename, workers=None, compress=None, on_error='raise'):
+        """
+        Saves a TSV summary of every language to `filename`.
+
+        - `workers`: compute the statistics of lazily loaded files that are
+          not in memory using a pool of this many processes. This only
+          affects `lazy=True` databases: statistics for lexicons already in
+          memory are quicker to compute here than to send to a worker.
+        - `compress`: gzip the output. Defaults to whether `filename` ends
+          in ".gz".
+        - `on_error`: "raise" to stop on the first invalid row, or "skip" to
+          leave invalid rows out.
+
+        Returns a list of (filename, error message) for the skipped rows.
+        """
+        if on_error not in ('raise', 'skip'):
+            raise ValueError("Unknown on_error: %s" % on_error)
+        if compress is None:
+            compress = str(filename).endswith('.gz')
+
+        if workers is not None and workers > 1:
+            pending = [
+                f for f in self.files
+                if f in self._lazy_files and f not in self._stats
+                and f not in self._lexicon_by_file
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for f, stats in zip(pending, pool.map(_file_stats, pending, chunksize=8)):
+                    self._stats[f] = stats
+
+        if compress:
+            out = gzip.open(filename, 'wt', encoding="utf8")
+        else:
+            out = codecs.open(filename, 'w', encoding="utf8")
+
+        errors, lines = [], ["\t".join(DETAILS_HEADER)]
+        with out:
             for f in self.files:
-                lang = self.get_details(f)
-                loc = self.get_location(f)
-                loc = {'longitude': '-', 'latitude': '-'} if loc is None else loc
-                taxon = self.get_slug_for(lang['language'], lang['id'])
-                line = [
-                    lang['id'],
-                    denone(lang['silcode']).strip(),
-                    denone(lang['glottocode']).strip(),
-                    lang['language'].strip(),
-                    taxon,
-                    '%d' % self.get_nlexemes(f),
-                    '%d' % self.get_ncognates(f),
-                    denone(lang['author']).strip(),
-                    fmt_loc(loc['latitude']),
-                    fmt_loc(loc['longitude']),
-                    denone(lang['classification']).strip(),
-                ]
                 try:
-                    [check_tabs(v) for v in line]
-                except (AssertionError, TypeError):  # pragma: no cover
-                    print("ERROR", line)
-                    raise
-                out.write("\t".join(line))
-                out.write("\n")
-        return
+                    lines.append("\t".join(self.get_details_row(f)))
+                except ValueError as e:
+                    if on_error == 'raise':
+                        raise
+                    errors.append((f, str(e)))
+                if len(lines) >= DETAILS_BATCH:
+                    out.write("\n".join(lines) + "\n")
+                    lines = []
+            if lines:
+                out.write("\n".join(lines) + "\n")
+        return errors
 
@@ -1,5 +1,5 @@
 __version__ = 2.0
 
-from .ABVD import ABVDatabase, Downloader, Parser, Record
+from .ABVD import ABVDatabase, AsyncDownloader, Downloader, Language, Parser, Record, RecordTable, RecordView
 from .ABVD import DeadLanguageError, InvalidLanguageError
 
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import os
+import json
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+EVICTION_POLICIES = ('lru', 'fifo')
+
+
+class DiskCache(object):
+    """
+    Persistent cache of the raw XML downloaded for each (database, language).
+
+    Each entry is stored as <directory>/<database>/<id>.xml with its HTTP
+    validators (ETag, Last-Modified) and timestamps in a matching .json file.
+
+    - `max_age`: seconds before an entry needs to be revalidated with the
+      server (None = entries never go stale).
+    - `max_size`: maximum total bytes of XML to keep (None = unbounded).
+    - `eviction`: which entries to drop when over `max_size`: "lru" (least
+      recently used) or "fifo" (oldest download).
+
+    The total size is read from disk once and then kept up to date in
+    memory, so entries only need to be scanned when it goes over `max_size`.
+    Reads mark an entry as used by updating the modification time of its
+    .json file rather than rewriting it.
+    """
+    def __init__(self, directory, max_age=None, max_size=None, eviction='lru'):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError("Unknown eviction policy: %s" % eviction)
+        self.directory = Path(directory).expanduser()
+        self.max_age = max_age
+        self.max_size = max_size
+        self.eviction = eviction
+        self._size = None
+
+    def _paths(self, database, language_id):
+        base = self.directory / database / ('%d' % language_id)
+        return base.with_suffix('.xml'), base.with_suffix('.json')
+
+    def _write(self, filename, content):
+        """Writes atomically so an interrupted run never leaves a partial entry."""
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=filename.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf8') as handle:
+            handle.write(content)
+        os.replace(tmp, filename)
+
+    def _read_meta(self, metafile):
+        try:
+            with open(metafile, encoding='utf8') as handle:
+                meta = json.load(handle)
+            # reads only update the file's modification time.
+            meta['accessed'] = max(meta['accessed'], os.stat(metafile).st_mtime)
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta
+
+    def get(self, database, language_id):
+        """
+        Returns the cached entry for `language_id` as a dictionary with the
+        keys content, etag, last_modified, fetched and accessed, or None.
+        """
+        xmlfile, metafile = self._paths(database, language_id)
+        meta = self._read_meta(metafile)
+        if meta is None:
+            return None
+        try:
+            with open(xmlfile, encoding='utf8') as handle:
+                meta['content'] = handle.read()
+        except FileNotFoundError:
+            return None
+        if self.eviction == 'lru':
+            meta['accessed'] = time.time()
+            try:
+                os.utime(metafile, (meta['accessed'], meta['accessed']))
+            except FileNotFoundError:
+                pass
+        return meta
+
+    def is_fresh(self, entry):
+        """Can `entry` be used without revalidating it with the server?"""
+        if self.max_age is None:
+            return True
+        return (time.time() - entry['fetched']) < self.max_age
+
+    def put(self, database, language_id, content, etag=None, last_modified=None):
+        xmlfile, metafile = self._paths(database, language_id)
+        now = time.time()
+        meta = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched': now,
+            'accessed': now,
+            'size': len(content.encode('utf8')),
+        }
+        previous = self._read_meta(metafile) if self._size is not None else None
+        self._write(xmlfile, content)
+        self._write(metafile, json.dumps(meta))
+        if self._size is not None:
+            self._size += meta['size'] - (previous['size'] if previous else 0)
+        self.evict()
+
+    def touch(self, database, language_id, meta=None, revalidated=True):
+        """
+        Marks an entry as used, and as confirmed up to date by the server
+        if `revalidated`.
+        """
+        _, metafile = self._paths(database, language_id)
+        meta = self._read_meta(metafile) if meta is None else meta
+        if meta is None:
+            return
+        meta = {k: v for k, v in meta.items() if k != 'content'}
+        meta['accessed'] = time.time()
+        if revalidated:
+            meta['fetched'] = meta['accessed']
+        self._write(metafile, json.dumps(meta))
+
+    def delete(self, database, language_id):
+        if self._size is not None:
+            meta = self._read_meta(self._paths(database, language_id)[1])
+            if meta is not None:
+                self._size -= meta['size']
+        for filename in self._paths(database, language_id):
+            try:
+                filename.unlink()
+            except FileNotFoundError:
+                pass
+
+    def entries(self):
+        """Yields (database, language_id, metadata) for every cached entry."""
+        for metafile in self.directory.glob('*/*.json'):
+            meta = self._read_meta(metafile)
+            if meta is not None:
+                yield metafile.parent.name, int(metafile.stem), meta
+
+    def size(self):
+        """Returns the total bytes of XML cached."""
+        if self._size is None:
+            self._size = sum(meta['size'] for _, _, meta in self.entries())
+        return self._size
+
+    def evict(self):
+        """Removes entries according to the eviction policy until under `max_size`."""
+        if self.max_size is None or self.size() <= self.max_size:
+            return
+        key = 'accessed' if self.eviction == 'lru' else 'fetched'
+        for database, language_id, meta in sorted(self.entries(), key=lambda e: e[2][key]):
+            if self.size() <= self.max_size:
+                break
+            self.delete(database, language_id)
+
+    def clear(self):
+        for database in self.directory.glob('*'):
+            if database.is_dir():
+                shutil.rmtree(database)
+        self._size = 0
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+#coding=utf-8
+import os
+import sys
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from abvd.ABVD import Parser, to_json
+from abvd.download_fast import write_atomic
+
+
+def is_stale(source, target):
+    """Is `target` missing or older than `source`?"""
+    try:
+        return os.path.getmtime(target) < os.path.getmtime(source)
+    except FileNotFoundError:
+        return True
+
+
+def convert_file(source, target):
+    """Parses the XML file `source` and saves it as JSON to `target`."""
+    with open(source, 'rb') as handle:
+        content = Parser().parse(handle)
+    # a partial file would be newer than `source` and never be redone.
+    write_atomic(target, to_json(content))
+    return target
+
+
+def convert(inputdir, outputdir, processes=None, force=False):
+    """
+    Converts every <id>.xml file in `inputdir` to <id>.json in `outputdir`
+    using a pool of `processes` workers (1 runs everything in this process).
+
+    Yields (source, target, status) tuples as each file finishes, where
+    status is "ok", "skipped" (output newer than source), or the error
+    message for files that could not be converted.
+    """
+    inputdir, outputdir = Path(inputdir), Path(outputdir)
+    outputdir.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    for source in sorted(inputdir.glob("*.xml")):
+        target = outputdir / ('%s.json' % source.stem)
+        if force or is_stale(source, target):
+            jobs.append((source, target))
+        else:
+            yield source, target, "skipped"
+
+    if processes == 1:
+        for source, target in jobs:
+            try:
+                convert_file(source, target)
+            except Exception as e:
+                yield source, target, "Error: %s" % e
+            else:
+                yield source, target, "ok"
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(convert_file, s, t): (s, t) for s, t in jobs}
+        for future in as_completed(futures):
+            source, target = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                yield source, target, "Error: %s" % e
+            else:
+                yield source, target, "ok"
+
+
+def main(args=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Converts a directory of ABVD XML files to JSON')
+    parser.add_argument("-j", "--processes", dest="processes", help="number of worker processes", type=int, default=None)
+    parser.add_argument("--force", dest="force", help="convert files even if up to date", action="store_true", default=False)
+    parser.add_argument("input", help="directory of XML files", type=Path)
+    parser.add_argument("output", help="directory to save JSON files to", type=Path)
+    if args is None:
+        args = sys.argv[1:]
+    args = parser.parse_args(args)
+
+    counts = {'ok': 0, 'skipped': 0, 'failed': 0}
+    for source, target, status in convert(args.input, args.output, args.processes, args.force):
+        if status in counts:
+            counts[status] += 1
+        else:
+            counts['failed'] += 1
+            print(f"{source} -> {status}")
+    print("converted: %(ok)d, skipped: %(skipped)d, failed: %(failed)d" % counts)
+    return 1 if counts['failed'] else 0
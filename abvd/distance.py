@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Pairwise lexical distances between languages: the proportion of the words
+attested in both languages that have no cognate set in common.
+
+Each language is encoded as one big integer bitset where every word has a
+fixed width field of `width` bits (a power of two), one bit per cognate set
+of that word, plus a bitset of which words it attests. For a pair of
+languages `a & b` has bits set for shared cognate sets, and OR-folding each
+field down onto its lowest bit and counting gives the number of words with
+at least one shared cognate set.
+"""
+import os
+import mmap
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from abvd.matrix import CognateMatrix, MISSING, PRESENT
+
+# state of every (encoded) language, set in each worker process.
+_STATE = {}
+
+
+class Encoding(object):
+    """The bitset encoding of the languages in a CognateMatrix."""
+    def __init__(self, matrix):
+        self.taxa = list(matrix.taxa)
+        spans, words = [], {}
+        for i, (wid, _) in enumerate(matrix.characters):
+            if wid not in words:
+                words[wid] = len(spans)
+                spans.append([i, i])
+            spans[words[wid]][1] = i + 1
+
+        longest = max([stop - start for start, stop in spans] + [1])
+        self.width = 1 << (longest - 1).bit_length()
+        self.nwords = len(spans)
+        self.mask = int(('0' * (self.width - 1) + '1') * self.nwords or '0', 2)
+
+        binary = bytes.maketrans(bytes([0, PRESENT, MISSING]), b'010')
+        self.bits, self.present = [], []
+        for taxon in self.taxa:
+            row = matrix.rows[taxon]
+            states = row.translate(binary).decode('ascii')
+            # fields are padded to `width`, and the string reversed as int()
+            # reads the most significant bit first.
+            fields = ''.join(states[start:stop].ljust(self.width, '0') for start, stop in spans)
+            self.bits.append(int(fields[::-1] or '0', 2))
+            attested = ''.join('0' if row[start] == MISSING else '1' for start, _ in spans)
+            self.present.append(int(attested[::-1] or '0', 2))
+
+    def state(self):
+        return {
+            'bits': self.bits, 'present': self.present,
+            'width': self.width, 'mask': self.mask,
+        }
+
+
+def _init(state):
+    _STATE.clear()
+    _STATE.update(state)
+
+
+def _shared(a, b, width, mask):
+    x = a & b
+    shift = 1
+    while shift < width:
+        x |= x >> shift
+        shift <<= 1
+    return (x & mask).bit_count()
+
+
+def _rows(start, stop):
+    """Condensed distances for rows start..stop against every later row."""
+    bits, present = _STATE['bits'], _STATE['present']
+    width, mask = _STATE['width'], _STATE['mask']
+    out = array('d')
+    for i in range(start, stop):
+        a, pa = bits[i], present[i]
+        for j in range(i + 1, len(bits)):
+            comparable = (pa & present[j]).bit_count()
+            if comparable:
+                out.append(1.0 - _shared(a, bits[j], width, mask) / comparable)
+            else:
+                out.append(math.nan)
+    return start, out
+
+
+def offset(i, n):
+    """Index of the first pair for row `i` in a condensed matrix of `n` taxa."""
+    return i * n - i * (i + 1) // 2
+
+
+def _blocks(n, nblocks):
+    """Splits rows into `nblocks` contiguous blocks with similar numbers of pairs."""
+    total = n * (n - 1) // 2
+    target = max(1, total // max(nblocks, 1))
+    blocks, start, count = [], 0, 0
+    for i in range(n):
+        count += n - i - 1
+        if count >= target:
+            blocks.append((start, i + 1))
+            start, count = i + 1, 0
+    if start < n:
+        blocks.append((start, n))
+    return blocks
+
+
+class Distances(object):
+    """
+    Condensed pairwise distance matrix (in the order of
+    scipy.spatial.distance.squareform) between `taxa`. NaN marks pairs
+    without any words in common.
+    """
+    def __init__(self, taxa, values, mmap=None):
+        self.taxa = taxa
+        self.values = values
+        self.mmap = mmap
+        self._index = {t: i for i, t in enumerate(taxa)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, a, b):
+        i, j = sorted((self._index[a], self._index[b]))
+        if i == j:
+            return 0.0
+        return self.values[offset(i, len(self.taxa)) + j - i - 1]
+
+    def close(self):
+        if self.mmap is not None:
+            self.values.release()
+            self.mmap.close()
+
+
+def pairwise(matrix, processes=None, blocks=None, filename=None):
+    """
+    Computes the distances between every pair of taxa in `matrix` (a
+    CognateMatrix), spread over `processes` worker processes (1 to run in
+    this process) in `blocks` blocks of rows.
+
+    If `filename` is given the results are written to a memory-mapped file
+    there (raw float64 values) rather than held in memory.
+    """
+    encoding = Encoding(matrix)
+    n = len(encoding.taxa)
+    npairs = n * (n - 1) // 2
+
+    handle = None
+    if filename is not None:
+        with open(filename, 'wb') as out:
+            out.truncate(8 * npairs)
+        if npairs:
+            with open(filename, 'r+b') as out:
+                handle = mmap.mmap(out.fileno(), 0)
+            values = memoryview(handle).cast('d')
+        else:
+            values = array('d')
+    else:
+        values = array('d', bytes(8 * npairs))
+
+    if processes == 1:
+        _init(encoding.state())
+        results = [_rows(start, stop) for start, stop in _blocks(n, blocks or 1)]
+        _STATE.clear()
+        for start, out in results:
+            values[offset(start, n):offset(start, n) + len(out)] = out
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init, initargs=(encoding.state(),)
+        ) as pool:
+            nblocks = blocks or 4 * (processes or os.cpu_count() or 1)
+            futures = [pool.submit(_rows, start, stop) for start, stop in _blocks(n, nblocks)]
+            for future in futures:
+                start, out = future.result()
+                values[offset(start, n):offset(start, n) + len(out)] = out
+    return Distances(encoding.taxa, values, mmap=handle)
+
+
+def from_database(db, processes=None, filename=None, **kwargs):
+    """Distances between all languages in `db`, see `CognateMatrix.from_records`."""
+    return pairwise(CognateMatrix.from_database(db, **kwargs), processes=processes, filename=filename)
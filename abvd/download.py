@@ -1,36 +1,45 @@
 #!/usr/bin/env python3
 #coding=utf-8
 import sys
-import json
 import argparse
 
-from abvd.ABVD import DATABASES, Downloader
+from abvd.ABVD import DATABASES, URL, Downloader, to_json
 from abvd import __version__
+from abvd import instrument
 
 
 def main(args=None):  # pragma: no cover
     parser = argparse.ArgumentParser(description='Downloads data from the ABVD')
     parser.add_argument('--raw', dest='raw', help="save XML", action="store_true", default=False)
+    parser.add_argument("--url", dest="url", help="URL template for each language, e.g. from abvd_mock", default=URL)
     parser.add_argument("database", help="database", choices=DATABASES)
     parser.add_argument("language", help="language", type=int)
     parser.add_argument(
         '-o', "--output", dest='output', default=None,
         help="output file", action='store'
     )
+    parser.add_argument("--stats", dest="stats", help="print timing and request statistics", action="store_true", default=False)
+    parser.add_argument("--profile", dest="profile", help="save timing and request statistics as JSON to this file", default=None)
     if args is None:
         args = sys.argv[1:]
     args = parser.parse_args(args)
+    instrument.enable(args.stats or args.profile is not None)
 
-    db = Downloader(args.database)
+    db = Downloader(args.database, url=args.url)
     content = db.get(args.language, raw=args.raw)
 
     if args.output:
         if args.raw:
-            db.write(output, xml=content)
+            db.write(args.output, xml=content)
         else:
-            db.write(output, content=content)
+            db.write(args.output, content=content)
     else:
         if args.raw:
             print(content)
         else:
-            print(json.dumps(content, sort_keys=True, indent=2, ensure_ascii=False))
+            print(to_json(content))
+
+    if args.stats:
+        print(instrument.summary(), file=sys.stderr)
+    if args.profile:
+        instrument.save(args.profile)
@@ -1,65 +1,315 @@
 #!/usr/bin/env python3
 #coding=utf-8
+import os
 import sys
+import json
 import time
-import codecs
+import hashlib
+import random
 import argparse
 import asyncio
+import tempfile
 from pathlib import Path
 
 import httpx
 
 from abvd.ABVD import URL, XMLTEMPLATE
-from abvd.ABVD import DEAD_LANGUAGES
+from abvd.ABVD import DATABASES, DEAD_LANGUAGES
+from abvd.sync import ChangeReport
+from abvd import instrument
 
 MAX_LANGUAGES = 1800
-LIMITS = httpx.Limits(max_keepalive_connections=5, max_connections=10)
+WORKERS = 10
+RETRIES = 3
+BACKOFF = 1.0  # seconds before the first retry, doubling each time.
+MAX_BACKOFF = 60.0
 
 
-async def download_to_file(client, abvd_id, outputdir):
-    url = URL % {'db': 'austronesian', 'id': abvd_id}
+class RateLimiter(object):
+    """Spaces out requests so no more than `rate` start per second."""
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.next = 0
+
+    async def wait(self):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        delay = self.next - now
+        self.next = max(now, self.next) + 1.0 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def get_backoff(attempt, backoff=BACKOFF):
+    """Exponential backoff with full jitter for retry number `attempt`."""
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2 ** attempt))
+
+
+def write_atomic(filename, content):
+    """Writes to a temporary file and renames it so `filename` is never truncated."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
     try:
-        response = await client.get(url, timeout=60)
-    except Exception as e:
-        return url, f"Error: {e}" 
+        with os.fdopen(fd, 'w', encoding='utf8') as out:
+            out.write(content)
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Manifest(object):
+    """
+    Record of which IDs in a download directory are complete ("ok"), known
+    to have no content ("missing") or failed, saved as manifest.json.
+    """
+    filename = 'manifest.json'
+    save_every = 25
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / self.filename
+        self.entries = {}
+        self._unsaved = 0
+        if self.path.exists():
+            with open(self.path, encoding='utf8') as handle:
+                self.entries = {int(k): v for k, v in json.load(handle).items()}
+        self.adopt()
+
+    def adopt(self):
+        """Adds complete XML files from runs made before there was a manifest."""
+        closing = XMLTEMPLATE.rsplit('\n', 1)[-1].encode('utf8')
+        for filename in self.directory.glob("*.xml"):
+            if not filename.stem.isdigit() or int(filename.stem) in self.entries:
+                continue
+            with open(filename, 'rb') as handle:
+                content = handle.read()
+            if content.rstrip().endswith(closing):  # i.e. not truncated.
+                self.add(int(filename.stem), 'ok', content)
+
+    def add(self, abvd_id, status, content=None, error=None):
+        entry = {'status': status}
+        if content is not None:
+            entry['size'] = len(content)
+            entry['sha256'] = hashlib.sha256(content).hexdigest()
+        if error is not None:
+            entry['error'] = error
+        self.entries[abvd_id] = entry
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def is_done(self, abvd_id, recheck_missing=False):
+        """Does `abvd_id` not need downloading again?"""
+        entry = self.entries.get(abvd_id)
+        if entry is None:
+            return False
+        elif entry['status'] == 'missing':
+            return not recheck_missing
+        elif entry['status'] == 'ok':
+            filename = self.directory / ('%d.xml' % abvd_id)
+            return filename.exists() and filename.stat().st_size == entry['size']
+        return False
+
+    def summary(self):
+        counts = {'ok': 0, 'missing': 0, 'failed': 0}
+        for entry in self.entries.values():
+            counts[entry['status']] += 1
+        return counts
+
+    def save(self):
+        write_atomic(self.path, json.dumps(
+            {str(k): v for k, v in sorted(self.entries.items())}, indent=2
+        ))
+        self._unsaved = 0
+
+
+async def download_to_file(client, abvd_id, outputdir, database='austronesian', retries=RETRIES, backoff=BACKOFF, limiter=None, manifest=None, report=None, url=URL):
+    """
+    Downloads `abvd_id` to <outputdir>/<abvd_id>.xml, retrying timeouts,
+    connection errors, 429 and 5xx responses up to `retries` times, and noting
+    the outcome in `manifest` if given.
+
+    If a sync `report` (ChangeReport) is given, files whose content has not
+    changed are left alone, and each change is added to the report. Files
+    for languages that now have no content are reported as removed but
+    kept, as an empty reply may only be transient.
 
+    Returns (abvd_id, url, status).
+    """
+    abvd_id, url, status, content = await download(
+        client, abvd_id, database, retries, backoff, limiter, url=url
+    )
+    filename = outputdir / ('%d.xml' % abvd_id)
+    if content is not None:
+        data = content.encode('utf8')
+        if report is not None:
+            old = read_if_exists(filename)
+            if old is None:
+                report.add_new(abvd_id)
+            elif get_hash(abvd_id, old, manifest) == hashlib.sha256(data).hexdigest():
+                report.add_unchanged(abvd_id)
+                if manifest is not None and not manifest.is_done(abvd_id):
+                    manifest.add(abvd_id, 'ok', data)
+                return abvd_id, url, "unchanged"
+            else:
+                report.add_changed(abvd_id, old, data)
+        write_atomic(filename, content)
+        if manifest is not None:
+            manifest.add(abvd_id, 'ok', data)
+    elif status == "no content":
+        if report is not None and filename.exists():
+            report.add_removed(abvd_id)
+        if manifest is not None:
+            manifest.add(abvd_id, 'missing')
+    elif manifest is not None:
+        manifest.add(abvd_id, 'failed', error=status)
+    return abvd_id, url, status
+
+
+def read_if_exists(filename):
+    try:
+        with open(filename, 'rb') as handle:
+            return handle.read()
+    except FileNotFoundError:
+        return None
+
+
+def get_hash(abvd_id, content, manifest=None):
+    """Returns the stored hash for `abvd_id` from `manifest`, or the hash of `content`."""
+    entry = manifest.entries.get(abvd_id, {}) if manifest is not None else {}
+    if entry.get('status') == 'ok' and entry.get('size') == len(content):
+        return entry['sha256']
+    return hashlib.sha256(content).hexdigest()
+
+
+async def download(client, abvd_id, database, retries, backoff, limiter, url=URL):
+    """
+    Fetches `abvd_id` from the `url` template, returning (abvd_id, url,
+    status, content) where content is the XML document or None.
+    """
+    url = url % {'db': database, 'id': abvd_id}
+    for attempt in range(retries + 1):
+        if attempt:
+            instrument.count('download.retries')
+            await asyncio.sleep(get_backoff(attempt - 1, backoff))
+        if limiter is not None:
+            await limiter.wait()
+        try:
+            with instrument.timer('download.request'):
+                response = await client.get(url, timeout=60)
+        except httpx.TransportError as e:
+            instrument.count('download.transport_errors')
+            status = f"Error: {e!r}"
+            continue
+        except Exception as e:
+            return abvd_id, url, f"Error: {e!r}", None
+
+        instrument.count('download.requests')
+        instrument.count('download.bytes', len(response.content))
+        # rate limited (429) or server errors are worth another try.
+        if response.status_code >= 500 or response.status_code == 429:
+            status = f"Error: HTTP {response.status_code}"
+            continue
+        break
+    else:
+        return abvd_id, url, status, None
+
+    if response.status_code != 200:  # e.g. an error page, so not a language.
+        return abvd_id, url, f"Error: HTTP {response.status_code}", None
     if len(response.text):
-        with codecs.open(outputdir / ('%d.xml' % abvd_id), 'w', 'utf8') as out:
-            out.write(XMLTEMPLATE % response.text)
-            print('.')
-            return url, response.status_code
+        return abvd_id, url, response.status_code, XMLTEMPLATE % response.text
     else:
-        return url, "no content"
+        return abvd_id, url, "no content", None
 
 
-async def fetch_all(abvd_ids, outputdir):
-    async with httpx.AsyncClient(default_encoding="utf-8", limits=LIMITS) as client:
-        tasks = [download_to_file(client, abvd_id, outputdir) for abvd_id in abvd_ids]
-        return await asyncio.gather(*tasks)
+async def fetch_all(abvd_ids, outputdir, database='austronesian', workers=WORKERS, retries=RETRIES, backoff=BACKOFF, rate=None, transport=None, manifest=None, report=None, url=URL):
+    """
+    Downloads `abvd_ids` from `database` with a fixed pool of `workers`,
+    yielding each (abvd_id, url, status) result as soon as it is complete.
 
+    `url` is the template for each language's URL, e.g. to point at a
+    local `abvd.mock` server.
+    """
+    pending = iter(abvd_ids)
+    results = asyncio.Queue()
+    limiter = RateLimiter(rate)
+    limits = httpx.Limits(max_keepalive_connections=workers, max_connections=workers)
 
+    async with httpx.AsyncClient(default_encoding="utf-8", limits=limits, transport=transport) as client:
+        async def worker():
+            for abvd_id in pending:
+                await results.put(await download_to_file(
+                    client, abvd_id, outputdir, database=database,
+                    retries=retries, backoff=backoff, limiter=limiter,
+                    manifest=manifest, report=report, url=url
+                ))
 
-async def get(args=None):  # pragma: no cover
+        tasks = asyncio.gather(*[worker() for _ in range(workers)])
+        tasks.add_done_callback(lambda _: results.put_nowait(None))
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+            await tasks
+        finally:
+            tasks.cancel()
 
-    if args.output.exists():
-        downloaded = [int(f.stem) for f in args.output.glob("*.xml")] + DEAD_LANGUAGES['austronesian']
-    else:
-        args.output.mkdir()
-        downloaded = DEAD_LANGUAGES['austronesian']
 
-    abvd_ids = [i for i in range(args.start, args.stop) if i not in downloaded]
-    print(len(abvd_ids))
-    results = await fetch_all(abvd_ids, args.output)
-    for url, status in results:
-        print(f"{url} -> {status}")
+async def get(args=None):  # pragma: no cover
+    databases = DATABASES if args.database == 'all' else [args.database]
+    for database in databases:
+        # keep databases apart when downloading all of them.
+        outputdir = args.output / database if args.database == 'all' else args.output
+        outputdir.mkdir(parents=True, exist_ok=True)
+        manifest = Manifest(outputdir)
+        report = ChangeReport() if args.sync else None
+
+        abvd_ids = [
+            i for i in range(args.start, args.stop)
+            if i not in DEAD_LANGUAGES[database]
+            # a sync checks everything again.
+            and (args.sync or not manifest.is_done(i, recheck_missing=args.recheck_missing))
+        ]
+        print(database, len(abvd_ids))
+        results = fetch_all(
+            abvd_ids, outputdir, database=database, workers=args.workers,
+            retries=args.retries, rate=args.rate, manifest=manifest, report=report,
+            url=args.url
+        )
+        try:
+            async for abvd_id, url, status in results:
+                print(f"{url} -> {status}")
+        finally:
+            manifest.save()
+        if report is not None:
+            report.save(outputdir / 'changes.json')
+            print(f"{database}: {report.summary()}")
+        counts = manifest.summary()
+        print(f"{database}: ok: {counts['ok']}, missing: {counts['missing']}, failed: {counts['failed']}")
 
 
 def main(args=None):  # pragma: no cover
     parser = argparse.ArgumentParser(description='Downloads data from the ABVD in XML')
+    parser.add_argument("--database", dest="database", help="database", choices=DATABASES + ['all'], default='austronesian')
     parser.add_argument("--start", dest="start", help="start ID", type=int, default=1)
     parser.add_argument("--stop", dest="stop", help="stop ID", type=int, default=MAX_LANGUAGES)
+    parser.add_argument("--workers", dest="workers", help="concurrent requests", type=int, default=WORKERS)
+    parser.add_argument("--retries", dest="retries", help="retries for timeouts and server errors", type=int, default=RETRIES)
+    parser.add_argument("--rate", dest="rate", help="maximum requests per second", type=float, default=None)
+    parser.add_argument("--recheck-missing", dest="recheck_missing", help="retry IDs that had no content", action="store_true", default=False)
+    parser.add_argument("--sync", dest="sync", help="re-check all IDs, only rewriting changed files, and save a report to changes.json", action="store_true", default=False)
+    parser.add_argument("--url", dest="url", help="URL template for each language, e.g. from abvd_mock", default=URL)
+    parser.add_argument("--stats", dest="stats", help="print timing and request statistics", action="store_true", default=False)
+    parser.add_argument("--profile", dest="profile", help="save timing and request statistics as JSON to this file", default=None)
     parser.add_argument("output", help="output", type=Path)
     if args is None:
         args = sys.argv[1:]
     args = parser.parse_args(args)
-    asyncio.run(get(args))
\ No newline at end of file
+    instrument.enable(args.stats or args.profile is not None)
+    try:
+        asyncio.run(get(args))
+    finally:
+        if args.stats:
+            print(instrument.summary(), file=sys.stderr)
+        if args.profile:
+            instrument.save(args.profile)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Lightweight counters and timers for seeing where time goes in downloads,
+parsing and loading. Everything is a no-op until `enable()` is called:
+
+    from abvd import instrument
+    instrument.enable()
+    ...
+    print(instrument.summary())
+"""
+import json
+import time
+from bisect import bisect_left
+
+enabled = False
+
+# upper bounds (in seconds, or other units for observe()) of histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, float('inf'))
+
+_counters = {}
+_histograms = {}
+
+
+def enable(flag=True):
+    global enabled
+    enabled = flag
+
+
+def reset():
+    _counters.clear()
+    _histograms.clear()
+
+
+def count(name, n=1):
+    """Adds `n` to the counter `name`."""
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name, value):
+    """Adds `value` to the histogram `name`."""
+    if not enabled:
+        return
+    h = _histograms.get(name)
+    if h is None:
+        h = _histograms[name] = {
+            'count': 0, 'total': 0.0, 'min': value, 'max': value,
+            'buckets': [0] * len(BUCKETS),
+        }
+    h['count'] += 1
+    h['total'] += value
+    h['min'] = min(h['min'], value)
+    h['max'] = max(h['max'], value)
+    h['buckets'][bisect_left(BUCKETS, value)] += 1
+
+
+class _Timer(object):
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Context manager adding the time its block takes to the histogram `name`."""
+    return _Timer(name) if enabled else _NULL_TIMER
+
+
+def stats():
+    """Returns {'counters': {name: n}, 'timers': {name: histogram}}."""
+    timers = {}
+    for name, h in sorted(_histograms.items()):
+        timers[name] = {
+            'count': h['count'],
+            'total': h['total'],
+            'mean': h['total'] / h['count'],
+            'min': h['min'],
+            'max': h['max'],
+            'buckets': {
+                ('<=%g' % b if b != float('inf') else '>%g' % BUCKETS[-2]): n
+                for b, n in zip(BUCKETS, h['buckets']) if n
+            },
+        }
+    return {'counters': dict(sorted(_counters.items())), 'timers': timers}
+
+
+def summary():
+    """Returns the statistics as readable text."""
+    s = stats()
+    lines = ["%-28s %12d" % (name, n) for name, n in s['counters'].items()]
+    for name, t in s['timers'].items():
+        lines.append("%-28s %6d x mean %8.4fs  min %8.4fs  max %8.4fs  total %8.3fs" % (
+            name, t['count'], t['mean'], t['min'], t['max'], t['total']
+        ))
+    return "\n".join(lines)
+
+
+def save(filename):
+    """Saves the statistics as JSON."""
+    with open(filename, 'w', encoding='utf8') as handle:
+        json.dump(stats(), handle, indent=2)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import re
+
+from abvd.tools import parse_cognacy
+
+ABSENT, PRESENT, MISSING = 0, 1, 2
+# maps the stored states to the characters written out.
+SYMBOLS = bytes.maketrans(bytes([ABSENT, PRESENT, MISSING]), b'01?')
+
+
+def _sort_key(character):
+    wid, cognate = character
+    return (wid, int(cognate) if cognate.isdigit() else float('inf'), cognate)
+
+
+def _label(word):
+    return re.sub(r'\W+', '_', word or '').strip('_')
+
+
+class CognateMatrix(object):
+    """
+    Binary presence/absence matrix of taxa x cognate sets.
+
+    Each row is a bytearray of ABSENT, PRESENT or MISSING states, one per
+    character, where characters are (word id, cognate set) pairs ordered by
+    word. A taxon is MISSING for every character of a word it has no
+    (usable) lexemes for.
+    """
+    def __init__(self, taxa, characters, rows, labels=None):
+        self.taxa = taxa
+        self.characters = characters
+        self.rows = rows
+        self.labels = labels or ["%s_%s" % c for c in characters]
+
+    @classmethod
+    def from_records(cls, records, loans=False, uncertain=True, singletons=False):
+        """
+        Builds a matrix from `records`.
+
+        - `loans`: include cognate sets coded for loan words.
+        - `uncertain`: include uncertain codings (e.g. "2?") as present.
+        - `singletons`: give each lexeme without a cognacy coding its own
+          cognate set, rather than ignoring it.
+        """
+        taxa, words, attested, present = [], {}, {}, {}
+        for r in records:
+            if not loans and r.is_loan:
+                continue
+            codes = [c for c, u in parse_cognacy(r.Cognacy) if uncertain or not u]
+            if not codes and singletons and r.Cognacy is None:
+                codes = ['u%s' % r.ID]
+            if not codes:
+                continue
+
+            taxon = r.language.taxon
+            if taxon not in attested:
+                taxa.append(taxon)
+                attested[taxon], present[taxon] = set(), set()
+            attested[taxon].add(r.WID)
+            words.setdefault(r.WID, r.Word)
+            present[taxon].update((r.WID, c) for c in codes)
+
+        characters = sorted(set().union(*present.values()), key=_sort_key)
+        column = {c: i for i, c in enumerate(characters)}
+        # characters are sorted by word, so each word is a contiguous slice.
+        span = {}
+        for i, (wid, _) in enumerate(characters):
+            start, _ = span.get(wid, (i, i))
+            span[wid] = (start, i + 1)
+
+        rows = {}
+        for taxon in taxa:
+            row = bytearray([MISSING]) * len(characters)
+            for wid in attested[taxon]:
+                start, stop = span[wid]
+                row[start:stop] = bytes(stop - start)
+            for c in present[taxon]:
+                row[column[c]] = PRESENT
+            rows[taxon] = row
+
+        labels = ["%s_%s" % (_label(words[wid]), cognate) for wid, cognate in characters]
+        return cls(taxa, characters, rows, labels)
+
+    @classmethod
+    def from_database(cls, db, **kwargs):
+        """Builds a matrix from all the records in `db`. See `from_records`."""
+        return cls.from_records(db.process(), **kwargs)
+
+    @property
+    def ntaxa(self):
+        return len(self.taxa)
+
+    @property
+    def nchar(self):
+        return len(self.characters)
+
+    def get_row(self, taxon):
+        """Returns the row for `taxon` as a string of 0, 1 and ?."""
+        return self.rows[taxon].translate(SYMBOLS).decode('ascii')
+
+    def write_nexus(self, filename):
+        width = max([len(t) for t in self.taxa] + [1]) + 2
+        with open(filename, 'w', encoding='utf8') as out:
+            out.write("#NEXUS\n\n")
+            out.write("BEGIN DATA;\n")
+            out.write("    DIMENSIONS NTAX=%d NCHAR=%d;\n" % (self.ntaxa, self.nchar))
+            out.write('    FORMAT DATATYPE=STANDARD MISSING=? GAP=- SYMBOLS="01";\n')
+            out.write("    CHARSTATELABELS\n")
+            out.write(",\n".join(
+                "        %d %s" % (i, label) for i, label in enumerate(self.labels, 1)
+            ))
+            out.write("\n    ;\n")
+            out.write("    MATRIX\n")
+            for taxon in self.taxa:
+                out.write("    %s%s\n" % (taxon.ljust(width), self.get_row(taxon)))
+            out.write("    ;\n")
+            out.write("END;\n")
+
+    def write_phylip(self, filename):
+        """Writes a relaxed phylip file (taxon names separated by whitespace)."""
+        width = max([len(t) for t in self.taxa] + [1]) + 2
+        with open(filename, 'w', encoding='utf8') as out:
+            out.write("%d %d\n" % (self.ntaxa, self.nchar))
+            for taxon in self.taxa:
+                out.write("%s%s\n" % (taxon.ljust(width), self.get_row(taxon)))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+A stand-in for the ABVD server, for testing and benchmarking downloads
+without the network. It answers the `utils/save` URLs that `Downloader` and
+`abvd_xml` use, either as an httpx transport or as a local HTTP server:
+
+    with MockABVD('fixtures/', latency=0.05).serve() as server:
+        Downloader('austronesian', url=server.url).get(99)
+"""
+import re
+import sys
+import time
+import random
+import asyncio
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from abvd.ABVD import DATABASES
+
+PATH = '/utils/save/'
+URL = "http://%s:%d" + PATH + "?type=xml&section=%%(db)s&language=%%(id)d"
+
+_WRAPPED = re.compile(r'^\s*<\?xml[^>]*>\s*<abvd>(.*)</abvd>\s*$', re.DOTALL)
+
+
+def unwrap(content):
+    """Strips the <?xml?> header and <abvd> root added by `abvd_xml`."""
+    match = _WRAPPED.match(content)
+    return match.group(1).strip() if match else content
+
+
+class MockABVD(object):
+    """
+    Serves languages from `directory`, as <database>/<id>.xml or <id>.xml
+    (for any database), and/or from `languages`, a dictionary of
+    {(database, id): xml}. Unknown languages get an empty response, like
+    the real server.
+
+    - `latency`: seconds to wait before each response.
+    - `error_rate`: proportion of requests answered with a 500 error.
+    - `empty_rate`: proportion of requests answered with no content.
+    - `bandwidth`: maximum bytes per second for each response.
+    """
+    def __init__(self, directory=None, languages=None, latency=0.0, error_rate=0.0, empty_rate=0.0, bandwidth=None, seed=0):
+        self.directory = None if directory is None else Path(directory)
+        self.languages = dict(languages or {})
+        self.latency = latency
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.bandwidth = bandwidth
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def get_content(self, database, language_id):
+        """Returns the XML records for a language, or '' if there is none."""
+        if (database, language_id) in self.languages:
+            return unwrap(self.languages[(database, language_id)])
+        if self.directory is not None:
+            for filename in (
+                self.directory / database / ('%d.xml' % language_id),
+                self.directory / ('%d.xml' % language_id),
+            ):
+                if filename.exists():
+                    return unwrap(filename.read_text(encoding='utf8'))
+        return ''
+
+    def respond(self, url):
+        """
+        Returns (status code, body, delay in seconds) for a request to
+        `url`, deciding any injected errors.
+        """
+        parts = urlsplit(str(url))
+        query = parse_qs(parts.query)
+        with self._lock:
+            self.requests += 1
+            error = self.random.random() < self.error_rate
+            empty = self.random.random() < self.empty_rate
+        try:
+            database = query['section'][0]
+            language_id = int(query['language'][0])
+        except (KeyError, ValueError):
+            return 400, b'', self.latency
+        if parts.path.rstrip('/') != PATH.rstrip('/') or database not in DATABASES:
+            return 404, b'', self.latency
+        if error:
+            return 500, b'', self.latency
+        body = b'' if empty else self.get_content(database, language_id).encode('utf8')
+        delay = self.latency
+        if self.bandwidth:
+            delay += len(body) / self.bandwidth
+        return 200, body, delay
+
+    def _response(self, status, body):
+        return httpx.Response(
+            status, content=body, headers={'content-type': 'text/xml; charset=utf-8'}
+        )
+
+    def transport(self, asynchronous=False):
+        """Returns an httpx transport answering requests from this mock."""
+        if asynchronous:
+            async def handler(request):
+                status, body, delay = self.respond(request.url)
+                if delay:
+                    await asyncio.sleep(delay)
+                return self._response(status, body)
+        else:
+            def handler(request):
+                status, body, delay = self.respond(request.url)
+                if delay:
+                    time.sleep(delay)
+                return self._response(status, body)
+        return httpx.MockTransport(handler)
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Starts a local HTTP server (in a thread) answering from this mock."""
+        return MockServer(self, host, port)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the headers and body are separate writes, which on a keep-alive
+    # connection otherwise wait ~40ms for Nagle's algorithm and delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        status, body, delay = self.server.mock.respond(self.path)
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(object):
+    """
+    A running local server for a MockABVD. `url` is the URL template to
+    give to `Downloader` or `abvd_xml --url`.
+    """
+    def __init__(self, mock, host='127.0.0.1', port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = mock
+        self.host, self.port = self.httpd.server_address[:2]
+        self.url = URL % (self.host, self.port)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(args=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Serves ABVD XML files like the ABVD server')
+    parser.add_argument("--host", dest="host", help="host to listen on", default='127.0.0.1')
+    parser.add_argument("--port", dest="port", help="port to listen on", type=int, default=8000)
+    parser.add_argument("--latency", dest="latency", help="seconds to wait before each response", type=float, default=0.0)
+    parser.add_argument("--error-rate", dest="error_rate", help="proportion of requests that fail", type=float, default=0.0)
+    parser.add_argument("--empty-rate", dest="empty_rate", help="proportion of requests with no content", type=float, default=0.0)
+    parser.add_argument("--bandwidth", dest="bandwidth", help="maximum bytes per second per response", type=float, default=None)
+    parser.add_argument("directory", help="directory of <id>.xml or <database>/<id>.xml files", type=Path)
+    if args is None:
+        args = sys.argv[1:]
+    args = parser.parse_args(args)
+    mock = MockABVD(
+        args.directory, latency=args.latency, error_rate=args.error_rate,
+        empty_rate=args.empty_rate, bandwidth=args.bandwidth
+    )
+    server = mock.serve(args.host, args.port)
+    print("serving %s at %s" % (args.directory, server.url))
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.close()
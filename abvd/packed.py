@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Single file, memory-mappable format for a corpus of ABVD languages.
+
+Layout (all integers little-endian):
+
+    header   MAGIC, version, nfiles, nstrings, ncolumns, then the offsets of
+             the columns, string offsets, string data, files and rows sections.
+    columns  JSON list of the lexicon field names.
+    strings  nstrings + 1 uint64 offsets into the UTF-8 string data. String 0
+             is None, so every value is stored as a uint32 string id.
+    files    per file: filename id, header id (JSON of the language and
+             location), first row, number of rows.
+    rows     one uint32 string id per column for every lexeme.
+"""
+import sys
+import json
+import mmap
+import struct
+import argparse
+from array import array
+from collections.abc import Mapping
+
+MAGIC = b'ABVDPACK'
+VERSION = 1
+HEADER = struct.Struct('<8sIIII5Q')
+FILE = struct.Struct('<IIQQ')
+ALIGN = 8
+
+
+def _pad(handle):
+    remainder = handle.tell() % ALIGN
+    if remainder:
+        handle.write(b'\0' * (ALIGN - remainder))
+
+
+def _tobytes(values):
+    if sys.byteorder == 'big':  # pragma: no cover
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _frombuffer(typecode, buffer):
+    if sys.byteorder == 'big':  # pragma: no cover
+        values = array(typecode, bytes(buffer))
+        values.byteswap()
+        return values
+    return memoryview(buffer).cast(typecode)
+
+
+def write(filename, files):
+    """
+    Saves `files`, a mapping of {filename: {'language': ..., 'location':
+    ..., 'lexicon': [...]}}, to the packed file `filename`.
+    """
+    strings, index = [None], {None: 0}
+
+    def intern(value):
+        if value not in index:
+            index[value] = len(strings)
+            strings.append(value)
+        return index[value]
+
+    entries = [(f, files[f]) for f in files]
+    columns = sorted({k for _, e in entries for r in e['lexicon'] for k in r})
+    rows, table = array('I'), []
+    for f, entry in entries:
+        header = json.dumps(
+            {'language': entry['language'], 'location': entry['location']},
+            sort_keys=True, ensure_ascii=False
+        )
+        table.append((intern(str(f)), intern(header), len(rows) // max(len(columns), 1), len(entry['lexicon'])))
+        for r in entry['lexicon']:
+            rows.extend(intern(r.get(k)) for k in columns)
+
+    offsets, data = array('Q', [0, 0]), bytearray()
+    for s in strings[1:]:
+        data.extend(s.encode('utf8'))
+        offsets.append(len(data))
+
+    with open(filename, 'wb') as handle:
+        handle.write(b'\0' * HEADER.size)
+        sections = []
+        for content in (
+            json.dumps(columns).encode('utf8'),
+            _tobytes(offsets),
+            bytes(data),
+            b''.join(FILE.pack(*t) for t in table),
+            _tobytes(rows),
+        ):
+            _pad(handle)
+            sections.append(handle.tell())
+            handle.write(content)
+        handle.seek(0)
+        handle.write(HEADER.pack(
+            MAGIC, VERSION, len(table), len(strings), len(columns), *sections
+        ))
+
+
+class PackedCorpus(object):
+    """A memory-mapped packed corpus, decoding only what is asked for."""
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as handle:
+            self.mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mmap)
+        magic, version, nfiles, nstrings, ncolumns, *sections = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise ValueError("%s is not a packed ABVD corpus" % filename)
+        if version != VERSION:
+            raise ValueError("Unsupported packed corpus version: %d" % version)
+        cols, offsets, data, files, rows = sections
+        self.columns = json.loads(self.mmap[cols:offsets].rstrip(b'\0'))
+        self.offsets = _frombuffer('Q', self.view[offsets:offsets + 8 * (nstrings + 1)])
+        self.data = data
+        self.rows = _frombuffer('I', self.view[rows:]) if ncolumns else []
+        self._strings = {0: None}
+        self.files = {}
+        for i in range(nfiles):
+            fid, hid, start, nrows = FILE.unpack_from(self.mmap, files + i * FILE.size)
+            self.files[self.string(fid)] = (hid, start, nrows)
+
+    def string(self, sid):
+        try:
+            return self._strings[sid]
+        except KeyError:
+            start = self.data + self.offsets[sid]
+            end = self.data + self.offsets[sid + 1]
+            self._strings[sid] = self.mmap[start:end].decode('utf8')
+            return self._strings[sid]
+
+    def get_header(self, filename):
+        return json.loads(self.string(self.files[filename][0]))
+
+    def get_lexicon(self, filename):
+        _, start, nrows = self.files[filename]
+        ncols = len(self.columns)
+        if not ncols:
+            return [{} for _ in range(nrows)]
+        rows = self.rows[start * ncols:(start + nrows) * ncols]
+        string = self.string
+        return [
+            {k: string(sid) for k, sid in zip(self.columns, rows[i:i + ncols])}
+            for i in range(0, nrows * ncols, ncols)
+        ]
+
+    def entries(self):
+        """Returns {filename: PackedEntry} for every file in the corpus."""
+        return {f: PackedEntry(self, f) for f in self.files}
+
+    def close(self):
+        # views on the mmap have to be released before it can be closed.
+        for view in (self.rows, self.offsets, self.view):
+            if isinstance(view, memoryview):
+                view.release()
+        self.mmap.close()
+
+
+class PackedEntry(Mapping):
+    """
+    One language in a packed corpus, used like the dictionary from a JSON
+    file. The language and location are decoded once, the lexicon every
+    time it is accessed.
+    """
+    KEYS = ('language', 'location', 'lexicon')
+
+    def __init__(self, corpus, filename):
+        self.corpus = corpus
+        self.filename = filename
+        self._header = None
+
+    def __getitem__(self, key):
+        if key == 'lexicon':
+            return self.corpus.get_lexicon(self.filename)
+        elif key in self.KEYS:
+            if self._header is None:
+                self._header = self.corpus.get_header(self.filename)
+            return self._header[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+
+def main(args=None):  # pragma: no cover
+    from abvd.ABVD import ABVDatabase
+    parser = argparse.ArgumentParser(description='Packs ABVD JSON or XML files into one corpus file')
+    parser.add_argument("output", help="packed corpus to create")
+    parser.add_argument("files", help="JSON or XML files", nargs='+')
+    if args is None:
+        args = sys.argv[1:]
+    args = parser.parse_args(args)
+
+    db = ABVDatabase()
+    for filename in args.files:
+        if filename.endswith('.xml'):
+            db.load_xml(filename)
+        else:
+            db.load(filename)
+    db.save_packed(args.output)
+    print("packed %d languages into %s" % (len(db.files), args.output))
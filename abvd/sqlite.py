@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import json
+import sqlite3
+from collections.abc import Mapping
+
+from abvd.ABVD import ABVDatabase, Parser, Record, read_json
+from abvd.tools import parse_cognacy
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS languages (
+    filename TEXT PRIMARY KEY,
+    LID INTEGER NOT NULL,
+    language TEXT,
+    glottocode TEXT,
+    details TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locations (
+    filename TEXT PRIMARY KEY REFERENCES languages(filename),
+    latitude TEXT,
+    longitude TEXT
+);
+CREATE TABLE IF NOT EXISTS lexicon (
+    filename TEXT NOT NULL REFERENCES languages(filename),
+    ID INTEGER NOT NULL,
+    LID INTEGER NOT NULL,
+    WID INTEGER NOT NULL,
+    Word TEXT,
+    Item TEXT,
+    Annotation TEXT,
+    Loan TEXT,
+    Cognacy TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS languages_lid ON languages(LID);
+CREATE INDEX IF NOT EXISTS languages_glottocode ON languages(glottocode);
+CREATE INDEX IF NOT EXISTS lexicon_filename ON lexicon(filename);
+CREATE INDEX IF NOT EXISTS lexicon_lid ON lexicon(LID);
+CREATE INDEX IF NOT EXISTS lexicon_wid ON lexicon(WID);
+-- no query can use an index on cognacy strings like "1,13".
+DROP INDEX IF EXISTS lexicon_cognacy;
+"""
+
+# lexicon fields with their own column, anything else is kept in `extra`.
+FIELDS = {
+    'id': 'ID', 'word_id': 'WID', 'word': 'Word', 'item': 'Item',
+    'annotation': 'Annotation', 'loan': 'Loan', 'cognacy': 'Cognacy',
+}
+
+RECORD_QUERY = """
+SELECT lexicon.ID, lexicon.LID, lexicon.WID, languages.language, lexicon.Word,
+    lexicon.Item, lexicon.Annotation, lexicon.Loan, lexicon.Cognacy
+FROM lexicon JOIN languages ON lexicon.filename = languages.filename
+"""
+
+
+class SQLiteDatabase(ABVDatabase):
+    """
+    ABVDatabase stored in SQLite, so queries use indexes rather than
+    loading every file into memory.
+
+    `path` is the SQLite database file (":memory:" by default), which
+    keeps everything imported into it between runs.
+    """
+    def __init__(self, path=':memory:', files=None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.files = SQLiteFiles(self)
+        if files:
+            self.import_files(files)
+
+    def import_files(self, filenames):
+        """Imports JSON files, or XML files ending in .xml."""
+        for filename in filenames:
+            if str(filename).endswith('.xml'):
+                self.load_xml(filename)
+            else:
+                self.load(filename)
+
+    def load(self, filename):
+        self.add(filename, read_json(filename))
+
+    def _store(self, filename, data):
+        self.add(filename, data)
+
+    def load_xml(self, filename):
+        with open(filename, 'rb') as handle:
+            self.add(filename, Parser().parse(handle))
+
+    def add(self, filename, entities):
+        """Adds (or replaces) the parsed `entities` for `filename`."""
+        language, location = entities['language'], entities['location']
+        language = {k: v for k, v in language.items() if k != 'filename'}
+        lid = int(language['id'])
+
+        def row(entry):
+            extra = {k: v for k, v in entry.items() if k not in FIELDS}
+            return (
+                filename, int(entry['id']), lid, int(entry['word_id']),
+                entry['word'], entry['item'], entry['annotation'],
+                entry['loan'], entry['cognacy'],
+                json.dumps(extra, ensure_ascii=False) if extra else None,
+            )
+
+        with self.connection:
+            self._delete(filename)
+            self.connection.execute(
+                "INSERT INTO languages VALUES (?, ?, ?, ?, ?)",
+                (filename, lid, language['language'],
+                 (language.get('glottocode') or '').strip() or None,
+                 json.dumps(language, ensure_ascii=False))
+            )
+            if location is not None:
+                self.connection.execute(
+                    "INSERT INTO locations VALUES (?, ?, ?)",
+                    (filename, location['latitude'], location['longitude'])
+                )
+            self.connection.executemany(
+                "INSERT INTO lexicon VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row(e) for e in entities['lexicon'])
+            )
+        self._lexicon_by_file.pop(filename, None)
+        self._stats.pop(filename, None)
+        self.records = None
+
+    def unload(self, filename):
+        with self.connection:
+            self._delete(filename)
+        self._lexicon_by_file.pop(filename, None)
+        self._stats.pop(filename, None)
+        self.records = None
+
+    def _delete(self, filename):
+        for table in ('lexicon', 'locations', 'languages'):
+            self.connection.execute("DELETE FROM %s WHERE filename = ?" % table, (filename,))
+
+    def _query(self, where, params=()):
+        cursor = self.connection.execute(RECORD_QUERY + where, params)
+        return [Record(*row) for row in cursor]
+
+    def get_details(self, filename):
+        row = self.connection.execute(
+            "SELECT details FROM languages WHERE filename = ?", (filename,)
+        ).fetchone()
+        if row is None:
+            raise ValueError("Data for %s not loaded" % filename)
+        d = json.loads(row[0])
+        d['filename'] = filename
+        return d
+
+    def get_location(self, filename):
+        row = self.connection.execute(
+            "SELECT latitude, longitude FROM locations WHERE filename = ?", (filename,)
+        ).fetchone()
+        return None if row is None else {'latitude': row[0], 'longitude': row[1]}
+
+    def get_entries(self, filename):
+        cursor = self.connection.execute(
+            "SELECT ID, WID, Word, Item, Annotation, Loan, Cognacy, extra "
+            "FROM lexicon WHERE filename = ? ORDER BY rowid", (filename,)
+        )
+        entries = []
+        for ID, WID, word, item, annotation, loan, cognacy, extra in cursor:
+            entry = {
+                'id': '%d' % ID, 'word_id': '%d' % WID, 'word': word,
+                'item': item, 'annotation': annotation, 'loan': loan,
+                'cognacy': cognacy,
+            }
+            entry.update(json.loads(extra) if extra else {})
+            entries.append(entry)
+        return entries
+
+    def _lexicon(self, filename):
+        return self._query(
+            "WHERE lexicon.filename = ? ORDER BY lexicon.rowid", (filename,)
+        )
+
+    def stats(self, filename):
+        if filename not in self._stats:
+            cursor = self.connection.execute(
+                "SELECT WID, COUNT(*), COUNT(Cognacy), "
+                "SUM(Loan IS NOT NULL AND Loan != '') "
+                "FROM lexicon WHERE filename = ? GROUP BY WID ORDER BY MIN(rowid)",
+                (filename,)
+            )
+            stats = {'nlexemes': 0, 'ncognates': 0, 'nloans': 0, 'coverage': {}}
+            for wid, nlexemes, ncognates, nloans in cursor:
+                stats['nlexemes'] += nlexemes
+                stats['ncognates'] += ncognates
+                stats['nloans'] += nloans
+                stats['coverage'][wid] = nlexemes
+            self._stats[filename] = stats
+        return self._stats[filename]
+
+    def process(self):
+        if not self.records:
+            self.records = self._query("ORDER BY languages.rowid, lexicon.rowid")
+        return self.records
+
+    def by_word(self, wid):
+        """Returns all records for the word (meaning) `wid`."""
+        return self._query("WHERE lexicon.WID = ? ORDER BY lexicon.rowid", (wid,))
+
+    def cognate_set(self, wid, cognate):
+        cognate = str(cognate)
+        return [
+            r for r in self.by_word(wid)
+            if cognate in [c for c, _ in parse_cognacy(r.Cognacy)]
+        ]
+
+    def by_language(self, lid):
+        return self._query("WHERE lexicon.LID = ? ORDER BY lexicon.rowid", (lid,))
+
+    def by_glottocode(self, glottocode):
+        cursor = self.connection.execute(
+            "SELECT LID FROM languages WHERE glottocode = ? ORDER BY rowid", (glottocode,)
+        )
+        return [row[0] for row in cursor]
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteFiles(Mapping):
+    """The `files` of an SQLiteDatabase: {filename: entry} read from the database."""
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, filename):
+        if filename not in self:
+            raise KeyError(filename)
+        return {
+            'language': self.db.get_details(filename),
+            'location': self.db.get_location(filename),
+            'lexicon': self.db.get_entries(filename),
+        }
+
+    def __contains__(self, filename):
+        return self.db.connection.execute(
+            "SELECT 1 FROM languages WHERE filename = ?", (filename,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        cursor = self.db.connection.execute("SELECT filename FROM languages ORDER BY rowid")
+        return iter([row[0] for row in cursor])
+
+    def __len__(self):
+        return self.db.connection.execute("SELECT COUNT(*) FROM languages").fetchone()[0]
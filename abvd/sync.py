@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# coding=utf-8
+import json
+from xml.etree import ElementTree
+
+from abvd.ABVD import Parser
+
+
+def diff_lexicon(old, new):
+    """
+    Compares the lexicons of two parsed languages by lexeme id, returning
+    counts of added, removed and modified lexemes.
+    """
+    old = {r['id']: r for r in old['lexicon']}
+    new = {r['id']: r for r in new['lexicon']}
+    return {
+        'added': len(new.keys() - old.keys()),
+        'removed': len(old.keys() - new.keys()),
+        'modified': len([k for k in old.keys() & new.keys() if old[k] != new[k]]),
+    }
+
+
+class ChangeReport(object):
+    """Collects which languages are new, changed, removed or unchanged in a sync."""
+    def __init__(self):
+        self.new = []
+        self.changed = {}
+        self.removed = []
+        self.unchanged = []
+
+    def add_new(self, abvd_id):
+        self.new.append(abvd_id)
+
+    def add_changed(self, abvd_id, old, new):
+        """Adds a changed language given its `old` and `new` XML."""
+        try:
+            self.changed[abvd_id] = diff_lexicon(Parser().parse(old), Parser().parse(new))
+        except (ValueError, ElementTree.ParseError) as e:  # unparseable, so just flag it.
+            self.changed[abvd_id] = {'error': str(e)}
+
+    def add_removed(self, abvd_id):
+        self.removed.append(abvd_id)
+
+    def add_unchanged(self, abvd_id):
+        self.unchanged.append(abvd_id)
+
+    def to_dict(self):
+        return {
+            'new': sorted(self.new),
+            'changed': {str(k): v for k, v in sorted(self.changed.items())},
+            'removed': sorted(self.removed),
+            'unchanged': len(self.unchanged),
+        }
+
+    def summary(self):
+        return "new: %d, changed: %d, removed: %d, unchanged: %d" % (
+            len(self.new), len(self.changed), len(self.removed), len(self.unchanged)
+        )
+
+    def save(self, filename):
+        with open(filename, 'w', encoding='utf8') as handle:
+            json.dump(self.to_dict(), handle, indent=2)
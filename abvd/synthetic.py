@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Deterministic generator of synthetic ABVD corpora, for benchmarks and
+tests at realistic sizes (up to ~2,000 languages x 210 meanings).
+
+Every language is generated from its own seed, so a language is the same
+whichever corpus size it is part of.
+"""
+import os
+import sys
+import random
+import argparse
+from xml.sax.saxutils import escape
+
+from abvd.ABVD import XMLTEMPLATE, to_json
+
+SYLLABLES = [
+    'a', 'ba', 'ka', 'ki', 'la', 'ma', 'mu', 'na', 'ŋa', 'ŋu', 'pa', 'ra',
+    'ri', 'sa', 'ta', 'tu', 'wa', 'ʔa', 'é', 'ö', 'ɛ', 'ʃi', 'ɲo', 'nd',
+]
+QUALIFIERS = ['', '', '', '', ' (North)', ' (Coastal)', ' [Dialect]', ' - Kei', '/Old']
+ANNOTATIONS = ['to eat (v.)', 'arm and hand', 'also "leg"', 'Dempwolff 1938', 'uncertain']
+AUTHORS = ['Blust', 'Greenhill', 'Tryon', 'Ross', 'Lynch']
+CLASSIFICATION = [
+    'Austronesian', 'Malayo-Polynesian', 'Central-Eastern Malayo-Polynesian',
+    'Eastern Malayo-Polynesian', 'Oceanic', 'Central-Eastern Oceanic',
+]
+
+
+def make_word(rng, minimum=1, maximum=3):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(minimum, maximum)))
+
+
+def make_meanings(nwords, seed=0):
+    """Returns [(word_id, word, number of cognate sets)] for `nwords` meanings."""
+    rng = random.Random(seed)
+    return [
+        (wid, "%s %d" % (make_word(rng, 1, 2), wid), rng.randint(1, 30))
+        for wid in range(1, nwords + 1)
+    ]
+
+
+def make_language(lid, meanings, seed=0):
+    """Returns a parsed language like `Parser.parse` would, for language `lid`."""
+    rng = random.Random("%s-%d" % (seed, lid))
+    name = make_word(rng, 2, 4).title() + rng.choice(QUALIFIERS)
+    language = {
+        'author': rng.choice(AUTHORS),
+        'checkedby': rng.choice([None, 'Simon Greenhill']),
+        'classification': ", ".join(CLASSIFICATION[:rng.randint(1, len(CLASSIFICATION))]),
+        'glottocode': rng.choice([None, 'synt%04d' % (lid % 10000)]),
+        'id': '%d' % lid,
+        'language': name,
+        'notes': rng.choice([None, None, 'Synthetic data']),
+        'problems': None,
+        'silcode': rng.choice([None, make_word(rng, 2, 2)[:3]]),
+        'typedby': rng.choice([None, 'Penny Keenan']),
+    }
+    location = None
+    if rng.random() < 0.95:
+        location = {
+            'latitude': '%0.20f' % rng.uniform(-25, 20),
+            'longitude': '%0.20f' % rng.uniform(95, 180),
+        }
+
+    lexicon = []
+    for wid, word, ncognates in meanings:
+        if rng.random() < 0.1:  # meaning not collected
+            continue
+        for _ in range(2 if rng.random() < 0.1 else 1):  # synonyms
+            cognacy = None
+            if rng.random() < 0.9:
+                codes = ['%d' % rng.randint(1, ncognates) for _ in range(2 if rng.random() < 0.05 else 1)]
+                cognacy = ",".join(c + ('?' if rng.random() < 0.03 else '') for c in codes)
+            lexicon.append({
+                'annotation': rng.choice(ANNOTATIONS) if rng.random() < 0.2 else None,
+                'cognacy': cognacy,
+                'id': '%d' % (lid * 100000 + len(lexicon) + 1),
+                'item': make_word(rng),
+                'loan': rng.choice(['L', 'English', 'Malay']) if rng.random() < 0.03 else None,
+                'pmpcognacy': rng.choice([None, '1', '2?']) if rng.random() < 0.1 else None,
+                'word': word,
+                'word_id': '%d' % wid,
+            })
+    return {'language': language, 'lexicon': lexicon, 'location': location}
+
+
+def make_corpus(nlanguages, nwords=210, seed=0):
+    """Yields `nlanguages` synthetic languages."""
+    meanings = make_meanings(nwords, seed)
+    for lid in range(1, nlanguages + 1):
+        yield make_language(lid, meanings, seed)
+
+
+def _record(adict):
+    fields = "".join(
+        "\t<%s>%s</%s>\n" % (k, '' if v is None else escape(v), k) for k, v in adict.items()
+    )
+    return "<record>\n%s</record>\n" % fields
+
+
+def to_xml(entities, wrap=True):
+    """
+    Renders a language as the XML saved by `abvd_xml`, or if `wrap` is
+    False the bare records the ABVD server sends.
+    """
+    records = [_record(entities['language'])]
+    if entities['location'] is not None:
+        records.append(_record(entities['location']))
+    records.extend(_record(r) for r in entities['lexicon'])
+    return XMLTEMPLATE % "".join(records) if wrap else "".join(records)
+
+
+def write_corpus(directory, nlanguages, nwords=210, seed=0, formats=('json',)):
+    """
+    Writes a synthetic corpus as <id>.json and/or <id>.xml files in
+    `directory`, returning {format: [filenames]}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    filenames = {f: [] for f in formats}
+    for entities in make_corpus(nlanguages, nwords, seed):
+        for fmt in formats:
+            filename = os.path.join(directory, '%s.%s' % (entities['language']['id'], fmt))
+            content = to_json(entities) if fmt == 'json' else to_xml(entities)
+            with open(filename, 'w', encoding='utf8') as handle:
+                handle.write(content)
+            filenames[fmt].append(filename)
+    return filenames
+
+
+def main(args=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Generates a synthetic ABVD corpus')
+    parser.add_argument("-n", "--languages", dest="languages", help="number of languages", type=int, default=100)
+    parser.add_argument("-w", "--words", dest="words", help="number of meanings", type=int, default=210)
+    parser.add_argument("--seed", dest="seed", help="random seed", type=int, default=0)
+    parser.add_argument("--format", dest="formats", help="file format(s) to write", choices=['json', 'xml'], action='append')
+    parser.add_argument("output", help="directory to save files to")
+    if args is None:
+        args = sys.argv[1:]
+    args = parser.parse_args(args)
+    filenames = write_corpus(
+        args.output, args.languages, args.words, args.seed, args.formats or ['json']
+    )
+    print("wrote %d files to %s" % (sum(len(f) for f in filenames.values()), args.output))
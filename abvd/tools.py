@@ -1,4 +1,5 @@
 import unicodedata
+from functools import lru_cache
 
 def clean(var):
     """Removes tabs, newlines and trailing whitespace"""
@@ -6,21 +7,61 @@ def clean(var):
         return ''
     return var.replace("\t", "").replace("\n", "").strip()
 
-def slugify(var):
-    remove = ["(", ")", ";", "?", '’', "'", ".", ",", ':', "‘",]
-    replace = [
-        (" - ", '_'), (" ", "_"), ("ŋ", "ng"), ('ʝ', "j"),
-        ('ɛ', 'e'), ('ʃ', 'sh'), ('ø', 'Y'), ('ɲ', 'nj'),
-    ]
+def parse_cognacy(var):
+    """
+    Parses a cognacy coding like "1,13" or "2?" into a list of
+    (cognate set, is_uncertain) tuples e.g. [('1', False), ('13', False)].
+    """
+    if var is None:
+        return []
+    codes = []
+    for code in var.replace(";", ",").split(","):
+        code = code.strip()
+        if code:
+            codes.append((code.replace("?", "").strip(), "?" in code))
+    return [c for c in codes if c[0]]
+
+# characters removed from slugs, then substrings replaced in order.
+SLUG_REMOVE = ["(", ")", ";", "?", '’', "'", ".", ",", ':', "‘",]
+SLUG_REPLACE = [
+    (" - ", '_'), (" ", "_"), ("ŋ", "ng"), ('ʝ', "j"),
+    ('ɛ', 'e'), ('ʃ', 'sh'), ('ø', 'Y'), ('ɲ', 'nj'),
+]
+# only these replacements can match an ASCII name.
+_SLUG_REPLACE_ASCII = [r for r in SLUG_REPLACE if r[0].isascii()]
+
+SLUG_CACHE_SIZE = 8192
+
+
+def _slugify(var):
     var = var.split("[")[0].strip()
     var = var.split("/")[0].strip()
-    var = unicodedata.normalize('NFKD', var)
-    var = "".join([c for c in var if not unicodedata.combining(c)])
-    var = var.replace("ß", "V")  # do this before casefolding
-    var = var.casefold()
-    for r in remove:
-        var = var.replace(r, "")
-    for r in replace:
-        var = var.replace(*r)
-    var = var.title()
-    return var
+    if var.isascii():
+        # NFKD leaves ASCII alone, and there is nothing to casefold but case.
+        var = var.lower()
+        replace = _SLUG_REPLACE_ASCII
+    else:
+        var = unicodedata.normalize('NFKD', var)
+        var = "".join([c for c in var if not unicodedata.combining(c)])
+        var = var.replace("ß", "V")  # do this before casefolding
+        var = var.casefold()
+        replace = SLUG_REPLACE
+    for r in SLUG_REMOVE:
+        if r in var:
+            var = var.replace(r, "")
+    for old, new in replace:
+        if old in var:
+            var = var.replace(old, new)
+    return var.title()
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def slugify(var):
+    return _slugify(var)
+
+
+def slugify_many(values):
+    """Slugifies every string in `values`, doing each distinct one once."""
+    values = list(values)
+    slugs = {v: _slugify(v) for v in set(values)}
+    return [slugs[v] for v in values]
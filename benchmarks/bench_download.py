@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Measures download throughput (languages per second) of `abvd_xml` against a
+local mock ABVD server at different concurrency settings.
+
+    python benchmarks/bench_download.py --languages 200 --latency 0.05 --workers 1 5 10 20
+"""
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from abvd.download_fast import fetch_all
+from abvd.mock import MockABVD
+from abvd.synthetic import make_corpus, to_xml
+
+
+async def download(ids, outputdir, workers, url):
+    statuses = {}
+    async for _, _, status in fetch_all(ids, outputdir, workers=workers, backoff=0.01, url=url):
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks downloads against a mock ABVD server')
+    parser.add_argument("-n", "--languages", dest="languages", help="number of languages", type=int, default=200)
+    parser.add_argument("-w", "--words", dest="words", help="number of meanings", type=int, default=210)
+    parser.add_argument("--latency", dest="latency", help="server latency in seconds", type=float, default=0.05)
+    parser.add_argument("--error-rate", dest="error_rate", help="proportion of requests that fail", type=float, default=0.0)
+    parser.add_argument("--bandwidth", dest="bandwidth", help="maximum bytes per second per response", type=float, default=None)
+    parser.add_argument("--workers", dest="workers", help="concurrency settings to try", type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument("-o", "--output", dest="output", help="JSON file to save results to", default=None)
+    args = parser.parse_args(args)
+
+    languages = {
+        ('austronesian', int(e['language']['id'])): to_xml(e, wrap=False)
+        for e in make_corpus(args.languages, args.words)
+    }
+    mock = MockABVD(
+        languages=languages, latency=args.latency,
+        error_rate=args.error_rate, bandwidth=args.bandwidth
+    )
+    ids = [lid for _, lid in languages]
+    results = []
+    with mock.serve() as server:
+        for workers in args.workers:
+            outputdir = Path(tempfile.mkdtemp())
+            try:
+                start = time.perf_counter()
+                statuses = asyncio.run(download(ids, outputdir, workers, server.url))
+                seconds = time.perf_counter() - start
+            finally:
+                shutil.rmtree(outputdir)
+            results.append({
+                'workers': workers,
+                'seconds': round(seconds, 3),
+                'languages_per_second': round(len(ids) / seconds, 1),
+                'statuses': {str(k): v for k, v in statuses.items()},
+            })
+            print("workers %3d: %7.1f languages/s (%.2fs)" % (
+                workers, len(ids) / seconds, seconds
+            ), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as handle:
+            json.dump({'languages': len(ids), 'latency': args.latency, 'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
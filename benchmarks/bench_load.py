@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Measures loading a synthetic corpus of JSON files into an ABVDatabase
+serially and with `load_many` using threads and processes.
+
+    python benchmarks/bench_load.py --languages 1000 --workers 2 4 8
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from abvd import ABVDatabase
+from abvd.ABVD import orjson
+from abvd.synthetic import write_corpus
+
+
+def load(filenames, lazy, workers=None, executor=None):
+    db = ABVDatabase(lazy=lazy)
+    db.load_many(filenames, workers=workers, executor=executor)
+    return db
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks loading JSON files')
+    parser.add_argument("-n", "--languages", dest="languages", help="number of languages", type=int, default=1000)
+    parser.add_argument("-w", "--words", dest="words", help="number of meanings", type=int, default=210)
+    parser.add_argument("--workers", dest="workers", help="pool sizes to try", type=int, nargs='+', default=[2, 4])
+    parser.add_argument("--lazy", dest="lazy", help="load lazily", action='store_true')
+    parser.add_argument("-o", "--output", dest="output", help="JSON file to save results to", default=None)
+    args = parser.parse_args(args)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        filenames = write_corpus(tmpdir, args.languages, args.words)['json']
+        runs = [('serial', 1, lambda: load(filenames, args.lazy))]
+        for executor in ('thread', 'process'):
+            for workers in args.workers:
+                runs.append((executor, workers, lambda e=executor, w=workers: load(filenames, args.lazy, w, e)))
+
+        results = []
+        for executor, workers, func in runs:
+            start = time.perf_counter()
+            db = func()
+            seconds = time.perf_counter() - start
+            assert len(db.files) == len(filenames)
+            results.append({
+                'executor': executor,
+                'workers': workers,
+                'seconds': round(seconds, 3),
+                'files_per_second': round(len(filenames) / seconds, 1),
+            })
+            print("%-8s %3d: %8.1f files/s (%.2fs)" % (
+                executor, workers, len(filenames) / seconds, seconds
+            ), file=sys.stderr)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as handle:
+            json.dump({
+                'languages': len(filenames), 'lazy': args.lazy, 'cpus': os.cpu_count(),
+                'decoder': 'json' if orjson is None else 'orjson', 'results': results,
+            }, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
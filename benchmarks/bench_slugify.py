@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Times slugify against the original implementation over a corpus of
+language names, either from ABVD JSON files given on the command line or
+generated.
+
+    python benchmarks/bench_slugify.py [json/*.json]
+"""
+import sys
+import json
+import random
+import timeit
+import unicodedata
+
+from abvd.tools import _slugify, slugify, slugify_many
+
+
+def reference_slugify(var):
+    remove = ["(", ")", ";", "?", '’', "'", ".", ",", ':', "‘",]
+    replace = [
+        (" - ", '_'), (" ", "_"), ("ŋ", "ng"), ('ʝ', "j"),
+        ('ɛ', 'e'), ('ʃ', 'sh'), ('ø', 'Y'), ('ɲ', 'nj'),
+    ]
+    var = var.split("[")[0].strip()
+    var = var.split("/")[0].strip()
+    var = unicodedata.normalize('NFKD', var)
+    var = "".join([c for c in var if not unicodedata.combining(c)])
+    var = var.replace("ß", "V")
+    var = var.casefold()
+    for r in remove:
+        var = var.replace(r, "")
+    for r in replace:
+        var = var.replace(*r)
+    var = var.title()
+    return var
+
+
+def generate_names(n=2000, seed=1):
+    rng = random.Random(seed)
+    syllables = ['ba', 'ka', 'ŋa', 'lo', 'mu', 'ti', 'sé', 'wa', 'ɛ', 'ro', 'ni', 'ʃi']
+    suffixes = ['', '', '', ' (North)', ' [Dialect]', ' / Other', " - Kei", ":n"]
+    names = []
+    for _ in range(n):
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        names.append(word.title() + rng.choice(suffixes))
+    return names
+
+
+def read_names(filenames):
+    names = []
+    for filename in filenames:
+        with open(filename, encoding='utf8') as handle:
+            names.append(json.load(handle)['language']['language'])
+    return names
+
+
+def main(args):
+    names = read_names(args) if args else generate_names()
+    # every record in a language calls get_taxon, so repeat each name.
+    records = [n for n in names for _ in range(200)]
+    assert [slugify(n) for n in names] == [reference_slugify(n) for n in names]
+
+    results = {
+        'reference': lambda: [reference_slugify(n) for n in records],
+        'fast path, no memo': lambda: [_slugify(n) for n in records],
+        'slugify (memoised)': lambda: [slugify(n) for n in records],
+        'slugify_many': lambda: slugify_many(records),
+    }
+    print("%d names, %d calls" % (len(set(names)), len(records)))
+    base = None
+    for label, func in results.items():
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        base = base or seconds
+        print("%-20s %8.3fs  %6.1fx" % (label, seconds, base / seconds))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Times parsing, loading, processing, save_details and slugify on a synthetic
+corpus, recording throughput and peak memory (via tracemalloc) as JSON so
+runs can be compared across commits.
+
+    python benchmarks/run.py --languages 2000 --words 210 --output results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+
+from abvd import ABVDatabase, Parser
+from abvd.synthetic import write_corpus
+from abvd.tools import slugify
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, memory=True, setup=None):
+    """
+    Runs `func` and returns (result, seconds, peak bytes). The peak is
+    measured in a second run, as tracemalloc slows everything down.
+    `setup` returns the arguments for `func`, and is not measured.
+    """
+    setup = setup or tuple
+    args = setup()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        args = setup()
+        tracemalloc.start()
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(directory, nlanguages, nwords, seed=0, memory=True):
+    files = write_corpus(directory, nlanguages, nwords, seed, formats=('json', 'xml'))
+    results = {}
+
+    def record(name, count, unit, seconds, peak):
+        results[name] = {
+            'seconds': round(seconds, 4),
+            'count': count,
+            'unit': unit,
+            'per_second': round(count / seconds, 1) if seconds else None,
+            'peak_bytes': peak,
+        }
+        print("%-14s %9.3fs %12.0f %s/s  peak %s" % (
+            name, seconds, results[name]['per_second'] or 0, unit,
+            '-' if peak is None else '%.1fMB' % (peak / 1e6)
+        ))
+
+    def parse():
+        n = 0
+        for filename in files['xml']:
+            with open(filename, 'rb') as handle:
+                n += len(Parser().parse(handle)['lexicon'])
+        return n
+    nrecords, seconds, peak = measure(parse, memory)
+    record('parse', nrecords, 'records', seconds, peak)
+
+    db, seconds, peak = measure(lambda: ABVDatabase(files=files['json']), memory)
+    record('load', nlanguages, 'files', seconds, peak)
+
+    _, seconds, peak = measure(
+        lambda fresh: fresh.process(), memory,
+        setup=lambda: (ABVDatabase(files=files['json']),)
+    )
+    record('process', nrecords, 'records', seconds, peak)
+
+    db.process()
+    details = os.path.join(directory, 'details.txt')
+    # clear the statistics so every run computes them.
+    _, seconds, peak = measure(
+        lambda: db.save_details(details), memory, setup=lambda: db._stats.clear() or ()
+    )
+    record('save_details', nlanguages, 'languages', seconds, peak)
+
+    names = [r.Language for r in db.process()]
+
+    def slugs():
+        slugify.cache_clear()
+        return [slugify(n) for n in names]
+    _, seconds, peak = measure(slugs, memory)
+    record('slugify', len(names), 'calls', seconds, peak)
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks abvd on a synthetic corpus')
+    parser.add_argument("-n", "--languages", dest="languages", help="number of languages", type=int, default=200)
+    parser.add_argument("-w", "--words", dest="words", help="number of meanings", type=int, default=210)
+    parser.add_argument("--seed", dest="seed", help="random seed", type=int, default=0)
+    parser.add_argument("--no-memory", dest="memory", help="skip measuring peak memory", action="store_false", default=True)
+    parser.add_argument("-o", "--output", dest="output", help="JSON file to save results to", default=None)
+    args = parser.parse_args(args)
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = run(directory, args.languages, args.words, args.seed, args.memory)
+    finally:
+        shutil.rmtree(directory)
+
+    report = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'languages': args.languages,
+        'words': args.words,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,10 +1,16 @@
 import os
+import gzip
+import json
+import shutil
 import unittest
 import tempfile
+from unittest import mock
 
-from abvd import ABVDatabase, Record
+from abvd import ABVDatabase, Parser, Record, RecordTable, RecordView
+from abvd.ABVD import Schema, orjson, read_json
 
 TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.json')
+TESTXML = os.path.join(os.path.dirname(__file__), 'nengone.xml')
 
 EXPECTED = {
     99: {
@@ -46,6 +52,10 @@ EXPECTED = {
 }
 
 
+def as_tuple(r):
+    return tuple(getattr(r, k) for k in Record.fields)
+
+
 class TestABVD(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -75,6 +85,13 @@ class TestABVD(unittest.TestCase):
 
     def test_get_ncognates(self):
         assert self.abvd.get_ncognates(TESTDATA) == 3
+
+    def test_stats(self):
+        self.assertEqual(self.abvd.stats(TESTDATA), {
+            'nlexemes': 4, 'ncognates': 3, 'nloans': 0,
+            'coverage': {1: 1, 4: 1, 37: 1, 199: 1},
+        })
+        assert self.abvd.stats(TESTDATA) is self.abvd.stats(TESTDATA)
     
     def test_process(self):
         for r in self.abvd.process():
@@ -91,3 +108,475 @@ class TestABVD(unittest.TestCase):
             out.seek(0)
             content = out.readlines()
         assert len(content) == 2  # two lines, header and Nengone
+
+
+class TestSaveDetails(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read(self, filename):
+        with open(filename, encoding='utf8') as handle:
+            return handle.read().splitlines()
+
+    def test_row(self):
+        row = ABVDatabase(files=[TESTDATA]).get_details_row(TESTDATA)
+        self.assertEqual(row[:7], ['99', 'nen', 'neng1238', 'Nengone', 'Nengone_99', '4', '3'])
+
+    def test_gzip(self):
+        db = ABVDatabase(files=[TESTDATA])
+        plain = os.path.join(self.tmpdir, 'details.txt')
+        compressed = os.path.join(self.tmpdir, 'details.txt.gz')
+        db.save_details(plain)
+        db.save_details(compressed)
+        with gzip.open(compressed, 'rt', encoding='utf8') as handle:
+            self.assertEqual(handle.read().splitlines(), self.read(plain))
+
+    def test_on_error(self):
+        db = ABVDatabase(files=[TESTDATA])
+        db.load_xml(TESTXML)
+        db.files[TESTXML]['language']['author'] = 'A\tB'
+        filename = os.path.join(self.tmpdir, 'details.txt')
+        with self.assertRaises(ValueError):
+            db.save_details(filename)
+        errors = db.save_details(filename, on_error='skip')
+        self.assertEqual([f for f, _ in errors], [TESTXML])
+        assert len(self.read(filename)) == 2
+
+    def test_bad_on_error(self):
+        with self.assertRaises(ValueError):
+            ABVDatabase().save_details(os.path.join(self.tmpdir, 'x'), on_error='ignore')
+
+    def test_workers(self):
+        files = []
+        for i in range(4):
+            files.append(os.path.join(self.tmpdir, '%d.json' % i))
+            shutil.copy(TESTDATA, files[-1])
+        expected = os.path.join(self.tmpdir, 'expected.txt')
+        ABVDatabase(files=files).save_details(expected)
+        db = ABVDatabase(files=files, lazy=True)
+        filename = os.path.join(self.tmpdir, 'details.txt')
+        assert db.save_details(filename, workers=2) == []
+        assert db._lexicon_by_file == {}  # lexicons were read in the workers
+        self.assertEqual(self.read(filename), self.read(expected))
+
+
+class TestFromXML(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.abvd = ABVDatabase.from_xml([TESTXML])
+
+    def test_load(self):
+        assert TESTXML in self.abvd.files
+
+    def test_get_details(self):
+        d = self.abvd.get_details(TESTXML)
+        assert d['id'] == '99'
+        assert d['language'] == 'Nengone'
+        assert d['filename'] == TESTXML
+
+    def test_get_location(self):
+        d = self.abvd.get_location(TESTXML)
+        assert d['latitude'] == "-21.53484700204878876661"
+
+    def test_counts(self):
+        assert self.abvd.get_nlexemes(TESTXML) == 4
+        assert self.abvd.get_ncognates(TESTXML) == 3
+
+    def test_process(self):
+        records = self.abvd.process()
+        assert len(records) == 4
+        for r in records:
+            assert r.ID in EXPECTED
+            for k in EXPECTED[r.ID]:
+                self.assertEqual(EXPECTED[r.ID][k], getattr(r, k))
+
+    def test_matches_json(self):
+        expected = [as_tuple(r) for r in ABVDatabase(files=[TESTDATA]).process()]
+        self.assertEqual([as_tuple(r) for r in self.abvd.process()], expected)
+
+
+    def test_registered_kinds(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'source.xml')
+            with open(TESTXML, encoding='utf8') as handle:
+                content = handle.read()
+            with open(filename, 'w', encoding='utf8') as handle:
+                handle.write(content + "<record><source_id>3</source_id><reference>Blust</reference></record>")
+            schema = Schema('source', ['source_id', 'reference'])
+            with mock.patch.object(Parser, 'schemas', Parser.schemas + [schema]):
+                db = ABVDatabase.from_xml([filename])
+            self.assertEqual(db.files[filename]['source'], [{'source_id': '3', 'reference': 'Blust'}])
+            assert db.get_location(filename) == self.abvd.get_location(TESTXML)
+            assert len(db.process()) == 4
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestCompact(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.abvd = ABVDatabase(files=[TESTDATA], compact=True)
+
+    def test_process(self):
+        records = self.abvd.process()
+        assert isinstance(records.lexicons[TESTDATA], RecordTable)
+        assert len(records) == 4
+        for r in records:
+            assert r.ID in EXPECTED
+            for k in EXPECTED[r.ID]:
+                self.assertEqual(EXPECTED[r.ID][k], getattr(r, k))
+
+    def test_matches_default(self):
+        expected = [as_tuple(r) for r in ABVDatabase(files=[TESTDATA]).process()]
+        self.assertEqual([as_tuple(r) for r in self.abvd.process()], expected)
+
+    def test_counts(self):
+        assert self.abvd.get_nlexemes(TESTDATA) == 4
+        assert self.abvd.get_ncognates(TESTDATA) == 3
+
+    def test_releases_lexicon(self):
+        db = ABVDatabase(files=[TESTDATA], compact=True)
+        db.process()
+        assert 'lexicon' not in db.files[TESTDATA]
+        with open(TESTDATA, encoding='utf8') as handle:
+            self.assertEqual(db.get_entries(TESTDATA), json.load(handle)['lexicon'])
+        assert len(db.process()) == 4
+
+    def test_from_xml(self):
+        db = ABVDatabase(compact=True)
+        db.load_xml(TESTXML)
+        assert isinstance(db.process().lexicons[TESTXML], RecordTable)
+        assert len(db.process()) == 4
+
+    def test_strings_are_shared(self):
+        db = ABVDatabase(files=[TESTDATA], compact=True)
+        db.load_xml(TESTXML)
+        tables = db.process().lexicons
+        assert tables[TESTDATA].pool is tables[TESTXML].pool
+
+
+class TestRecordTable(unittest.TestCase):
+    def setUp(self):
+        self.records = [
+            Record(ID=1, LID=3, WID=2, Language='English', Word='Hand', Item='hand'),
+            Record(ID=2, LID=3, WID=4, Language='English', Word='Foot', Item='foot', Cognacy='1,2'),
+            Record(Language='English', Loan='L'),
+        ]
+        self.table = RecordTable(self.records)
+
+    def test_len(self):
+        assert len(self.table) == 3
+
+    def test_roundtrip(self):
+        self.assertEqual(
+            [as_tuple(r) for r in self.table],
+            [as_tuple(r) for r in self.records]
+        )
+
+    def test_getitem(self):
+        self.assertEqual(as_tuple(self.table[1]), as_tuple(self.records[1]))
+        self.assertEqual(as_tuple(self.table[-1]), as_tuple(self.records[-1]))
+        assert self.table[2].is_loan
+        assert self.table[0].get_taxon() == 'English_3'
+
+    def test_interning(self):
+        assert self.table.pool.strings.count('English') == 1
+
+    def test_extend_shared_pool(self):
+        other = RecordTable(pool=self.table.pool)
+        other.extend(self.table)
+        self.assertEqual(
+            [as_tuple(r) for r in other],
+            [as_tuple(r) for r in self.records]
+        )
+
+
+class TestLazy(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.filenames = []
+        for i in range(3):
+            cls.filenames.append(os.path.join(cls.tmpdir, '%d.json' % i))
+            shutil.copy(TESTDATA, cls.filenames[-1])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_index_only(self):
+        db = ABVDatabase(files=[TESTDATA], lazy=True)
+        assert 'lexicon' not in db.files[TESTDATA]
+        assert db.get_details(TESTDATA)['language'] == 'Nengone'
+        assert db.get_location(TESTDATA)['longitude'] == "167.98095703125000000000"
+
+    def test_read_index_matches_load(self):
+        with open(TESTDATA, encoding='utf8') as handle:
+            expected = json.load(handle)
+        index = ABVDatabase().read_index(TESTDATA)
+        self.assertEqual(index['language'], expected['language'])
+        self.assertEqual(index['location'], expected['location'])
+
+    def test_read_index_unsorted(self):
+        filename = os.path.join(self.tmpdir, 'unsorted.json')
+        with open(filename, 'w', encoding='utf8') as handle:
+            json.dump({'location': None, 'lexicon': [], 'language': {'id': '1'}}, handle)
+        self.assertEqual(
+            ABVDatabase().read_index(filename),
+            {'location': None, 'language': {'id': '1'}}
+        )
+
+    def test_process(self):
+        db = ABVDatabase(files=[TESTDATA], lazy=True)
+        expected = [as_tuple(r) for r in ABVDatabase(files=[TESTDATA]).process()]
+        self.assertEqual([as_tuple(r) for r in db.process()], expected)
+        assert db.get_nlexemes(TESTDATA) == 4
+
+    def test_max_resident(self):
+        db = ABVDatabase(files=self.filenames, lazy=True, max_resident=2)
+        for f in self.filenames:
+            assert len(list(db.get_lexicon(f))) == 4
+        self.assertEqual(list(db._lexicon_by_file), self.filenames[1:])
+        # using a file makes it the most recently used
+        list(db.get_lexicon(self.filenames[1]))
+        list(db.get_lexicon(self.filenames[0]))
+        self.assertEqual(list(db._lexicon_by_file), [self.filenames[1], self.filenames[0]])
+        assert len(db.process()) == 12
+
+    def test_max_resident_after_process(self):
+        expected = [as_tuple(r) for r in ABVDatabase(files=self.filenames).process()]
+        db = ABVDatabase(files=self.filenames, lazy=True, max_resident=2)
+        records = db.process()
+        assert len(db._lexicon_by_file) == 2
+        self.assertEqual([as_tuple(r) for r in records], expected)
+        self.assertEqual([as_tuple(records[i]) for i in range(len(records))], expected)
+        assert len(db._lexicon_by_file) == 2
+
+    def test_max_resident_after_index(self):
+        # the indexes keep every record, whatever max_resident is.
+        db = ABVDatabase(files=self.filenames, lazy=True, max_resident=1)
+        db.build_index()
+        assert len(db._lexicon_by_file) == 1
+        assert len(db.by_word(1)) == 3
+        assert len({id(r) for r in db.by_word(1)}) == 3
+
+
+class TestIncremental(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.filename = os.path.join(cls.tmpdir, 'other.json')
+        with open(TESTDATA, encoding='utf8') as handle:
+            data = json.load(handle)
+        data['language']['id'] = '100'
+        data['lexicon'] = data['lexicon'][:2]
+        with open(cls.filename, 'w', encoding='utf8') as handle:
+            json.dump(data, handle)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_load_after_process(self):
+        db = ABVDatabase(files=[TESTDATA])
+        records = db.process()
+        assert len(records) == 4
+        db.load(self.filename)
+        assert db.process() is records
+        assert len(records) == 6
+        self.assertEqual([r.LID for r in records], [99] * 4 + [100] * 2)
+        self.assertEqual(records[-1].LID, 100)
+        self.assertEqual(records[3].LID, 99)
+        assert db.get_nlexemes(self.filename) == 2
+
+    def test_unload(self):
+        db = ABVDatabase(files=[TESTDATA, self.filename])
+        records = db.process()
+        assert db.get_nlexemes(self.filename) == 2
+        assert len(db.by_language(100)) == 2
+        db.unload(self.filename)
+        assert self.filename not in db.files
+        assert self.filename not in db._lexicon_by_file
+        assert len(records) == 4
+        assert db.by_language(100) == []
+
+    def test_reload(self):
+        tmp = os.path.join(self.tmpdir, 'reload.json')
+        shutil.copy(TESTDATA, tmp)
+        db = ABVDatabase(files=[tmp, self.filename], compact=True)
+        records = db.process()
+        assert db.get_nlexemes(tmp) == 4
+        with open(tmp, encoding='utf8') as handle:
+            data = json.load(handle)
+        data['lexicon'] = data['lexicon'][:1]
+        with open(tmp, 'w', encoding='utf8') as handle:
+            json.dump(data, handle)
+        db.load(tmp)
+        assert db.get_nlexemes(tmp) == 1
+        self.assertEqual(db.stats(tmp)['coverage'], {1: 1})
+        # the reloaded file keeps its place
+        self.assertEqual([r.LID for r in records], [99, 100, 100])
+
+    def test_view(self):
+        db = ABVDatabase(files=[TESTDATA, self.filename])
+        records = db.process()
+        assert isinstance(records, RecordView)
+        expected = list(records)
+        self.assertEqual([records[i] for i in range(len(records))], expected)
+        self.assertEqual(records[-2:], expected[-2:])
+        assert records.index(expected[4]) == 4
+        assert expected[0] in records
+        self.assertEqual(records + [None], expected + [None])
+        self.assertEqual([None] + records, [None] + expected)
+        db.unload(TESTDATA)
+        assert len(records) == 2
+        self.assertEqual([records[0], records[1]], expected[4:])
+        with self.assertRaises(IndexError):
+            records[2]
+
+    def test_load_xml(self):
+        db = ABVDatabase(files=[self.filename])
+        records = db.process()
+        db.load_xml(TESTXML)
+        assert len(records) == 6
+        assert db.get_ncognates(TESTXML) == 3
+
+
+class TestReadJSON(unittest.TestCase):
+    def setUp(self):
+        with open(TESTDATA, encoding='utf8') as handle:
+            self.expected = json.load(handle)
+
+    def test_stdlib(self):
+        with mock.patch('abvd.ABVD.orjson', None):
+            self.assertEqual(read_json(TESTDATA), self.expected)
+
+    def test_orjson(self):
+        # stands in for orjson, which takes bytes.
+        decoder = mock.Mock()
+        decoder.loads.side_effect = lambda content: json.loads(content.decode('utf8'))
+        with mock.patch('abvd.ABVD.orjson', decoder):
+            self.assertEqual(read_json(TESTDATA), self.expected)
+        assert isinstance(decoder.loads.call_args[0][0], bytes)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_real_orjson(self):
+        self.assertEqual(read_json(TESTDATA), self.expected)
+
+
+class TestLoadMany(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        with open(TESTDATA, encoding='utf8') as handle:
+            data = json.load(handle)
+        cls.files = []
+        for i in range(5):
+            data['language']['id'] = '%d' % (100 + i)
+            cls.files.append(os.path.join(cls.tmpdir, '%d.json' % i))
+            with open(cls.files[-1], 'w', encoding='utf8') as handle:
+                json.dump(data, handle, ensure_ascii=False)
+        cls.broken = os.path.join(cls.tmpdir, 'broken.json')
+        with open(cls.broken, 'w', encoding='utf8') as handle:
+            handle.write('{"language": ')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_same_as_load(self):
+        for executor in (None, 'thread', 'process'):
+            expected = ABVDatabase(files=self.files)
+            db = ABVDatabase()
+            report = db.load_many(self.files, workers=2, executor=executor)
+            self.assertEqual([r['filename'] for r in report], self.files)
+            assert all(r['error'] is None for r in report)
+            self.assertEqual(list(db.files), self.files)
+            self.assertEqual(db.files, expected.files)
+            self.assertEqual(
+                [as_tuple(r) for r in db.process()],
+                [as_tuple(r) for r in expected.process()]
+            )
+
+    def test_workers(self):
+        db = ABVDatabase(files=self.files, workers=2)
+        self.assertEqual(list(db.files), self.files)
+        self.assertEqual([r.LID for r in db.process()][::4], [100, 101, 102, 103, 104])
+
+    def test_after_process(self):
+        db = ABVDatabase(files=[TESTDATA])
+        records = db.process()
+        db.load_many(self.files[:2], executor='thread')
+        assert len(records) == 12
+
+    def test_lazy(self):
+        db = ABVDatabase(lazy=True)
+        db.load_many(self.files, workers=2, executor='thread')
+        assert db._lazy_files == set(self.files)
+        assert db.get_details(self.files[2])['id'] == '102'
+        assert len(db.process()) == 20
+
+    def test_errors(self):
+        files = self.files[:2] + [self.broken] + self.files[2:]
+        with self.assertRaises(ValueError):
+            ABVDatabase().load_many(files)
+        db = ABVDatabase()
+        report = db.load_many(files, on_error='skip')
+        self.assertEqual([r['filename'] for r in report], files)
+        self.assertEqual([r['filename'] for r in report if r['error']], [self.broken])
+        self.assertEqual(list(db.files), self.files)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            ABVDatabase().load_many(self.files, on_error='ignore')
+        with self.assertRaises(ValueError):
+            ABVDatabase().load_many(self.files, executor='fibre')
+
+
+class TestIndexes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.abvd = ABVDatabase(files=[TESTDATA])
+
+    def test_by_word(self):
+        records = self.abvd.by_word(37)
+        assert [r.ID for r in records] == [90697]
+        assert self.abvd.by_word(1000) == []
+
+    def test_cognate_set(self):
+        assert [r.ID for r in self.abvd.cognate_set(4, 13)] == [93340]
+        assert [r.ID for r in self.abvd.cognate_set(4, '13')] == [93340]
+        assert self.abvd.cognate_set(4, 1) == []
+        assert self.abvd.cognate_set(37, 1) == []
+
+    def test_cognate_set_multiple(self):
+        db = ABVDatabase()
+        db.files['x'] = {
+            'language': {'id': '1', 'language': 'X', 'glottocode': None},
+            'location': None,
+            'lexicon': [
+                {'id': '1', 'word_id': '1', 'word': 'hand', 'item': 'a', 'annotation': None, 'loan': None, 'cognacy': '1,13'},
+                {'id': '2', 'word_id': '1', 'word': 'hand', 'item': 'b', 'annotation': None, 'loan': None, 'cognacy': '13?'},
+            ]
+        }
+        assert [r.ID for r in db.cognate_set(1, 1)] == [1]
+        assert [r.ID for r in db.cognate_set(1, 13)] == [1, 2]
+        assert db.by_glottocode('neng1238') == []
+
+    def test_by_language(self):
+        assert len(self.abvd.by_language(99)) == 4
+        assert self.abvd.by_language(100) == []
+
+    def test_by_glottocode(self):
+        assert self.abvd.by_glottocode('neng1238') == [99]
+        assert self.abvd.by_glottocode('xxxx1234') == []
+
+    def test_rebuilt_on_load(self):
+        db = ABVDatabase(files=[TESTDATA])
+        assert len(db.by_word(37)) == 1
+        db.load_xml(TESTXML)
+        assert db._index is None
@@ -6,8 +6,30 @@ __copyright__ = 'Copyright (c) 2016 Simon J. Greenhill'
 __license__ = 'New-style BSD'
 
 import os
+import codecs
+import asyncio
 import unittest
-from abvd import Downloader, DeadLanguageError, InvalidLanguageError
+
+import httpx
+
+from abvd import AsyncDownloader, Downloader, DeadLanguageError, InvalidLanguageError
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+def make_transport():
+    with codecs.open(TESTDATA, 'r', encoding='utf8') as handle:
+        content = handle.read()
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.params['language'])
+        if request.url.params['language'] == '99':
+            return httpx.Response(200, content=content.encode('utf8'))
+        return httpx.Response(200, content=b'')
+    transport = httpx.MockTransport(handler)
+    transport.requested = requested
+    return transport
 
 
 class Test_Downloader(unittest.TestCase):
@@ -34,3 +56,71 @@ class Test_Downloader(unittest.TestCase):
             d.is_valid_language(261)
         # but 261 is only invalid in austronesian
         assert Downloader("bantu").is_valid_language(261)
+
+
+class Test_Downloader_Get(unittest.TestCase):
+    def test_close(self):
+        with Downloader('austronesian', transport=make_transport()) as d:
+            d.get(99)
+            client = d.client
+        assert client.is_closed
+        assert d._client is None
+
+    def test_get(self):
+        d = Downloader('austronesian', transport=make_transport())
+        assert d.get(99)['language']['language'] == 'Nengone'
+        assert d.get(99, raw=True).startswith('<record>')
+
+    def test_get_invalid(self):
+        d = Downloader('austronesian', transport=make_transport())
+        with self.assertRaises(InvalidLanguageError):
+            d.get(1)
+
+    def test_reuses_client(self):
+        d = Downloader('austronesian', transport=make_transport())
+        assert d.client is d.client
+
+
+class Test_GetMany(unittest.TestCase):
+    def test_sync_transport(self):
+        d = Downloader('austronesian', transport=httpx.HTTPTransport())
+        with self.assertRaises(TypeError):
+            d.get_many([99])
+
+    def test_running_loop(self):
+        async def run():
+            Downloader('austronesian', transport=make_transport()).get_many([99])
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run())
+
+    def test_get_many(self):
+        transport = make_transport()
+        d = Downloader('austronesian', transport=transport)
+        results = d.get_many([99, 99], raw=True)
+        self.assertEqual(list(results), [99])
+        results = d.get_many([99])
+        assert results[99]['language']['language'] == 'Nengone'
+
+    def test_get_many_raises(self):
+        d = Downloader('austronesian', transport=make_transport())
+        with self.assertRaises(InvalidLanguageError):
+            d.get_many([99, 1])
+        with self.assertRaises(DeadLanguageError):
+            d.get_many([261])
+
+    def test_get_many_return_exceptions(self):
+        d = Downloader('austronesian', transport=make_transport())
+        results = d.get_many([1, 99, 261], return_exceptions=True)
+        self.assertEqual(list(results), [1, 99, 261])
+        assert isinstance(results[1], InvalidLanguageError)
+        assert isinstance(results[261], DeadLanguageError)
+        assert results[99]['language']['language'] == 'Nengone'
+
+    def test_async(self):
+        transport = make_transport()
+        d = AsyncDownloader('austronesian', transport=transport, concurrency=3)
+        results = asyncio.run(
+            d.get_many(range(95, 105), raw=True, return_exceptions=True)
+        )
+        assert len(results) == 10
+        assert sorted(transport.requested) == sorted(str(i) for i in range(95, 105))
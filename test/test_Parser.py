@@ -5,12 +5,15 @@ __author__ = 'Simon J. Greenhill <simon@simon.net.nz>'
 __copyright__ = 'Copyright (c) 2016 Simon J. Greenhill'
 __license__ = 'New-style BSD'
 
+import io
 import os
 import codecs
+import pathlib
 import unittest
 from xml.dom import minidom
 
 from abvd import Parser
+from abvd.ABVD import CHUNKSIZE, XMLTEMPLATE, LEXICON_SCHEMA
 
 TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.xml')
 
@@ -223,3 +226,125 @@ class Test_Parser(unittest.TestCase):
     def test_no_lexicon(self):
         with self.assertRaises(ValueError):
             Parser().parse(XML_NO_LEXICON)
+
+
+class Test_IterParse(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with codecs.open(TESTDATA, 'r', encoding='utf8') as handle:
+            cls.content = handle.read()
+
+    def test_kinds(self):
+        kinds = [k for k, r in Parser().iterparse(self.content)]
+        self.assertEqual(
+            kinds, ['language', 'location', 'lexicon', 'lexicon', 'lexicon', 'lexicon']
+        )
+
+    def test_records(self):
+        records = list(Parser().iterparse(self.content))
+        for k in LNG:
+            self.assertEqual(LNG[k], records[0][1][k])
+        for k in LOC:
+            self.assertEqual(LOC[k], records[1][1][k])
+        assert records[3][1]['item'] == "iñtërnâtiônàlizætiøn"
+        assert records[2][1]['loan'] is None
+
+    def test_sources(self):
+        expected = list(Parser().iterparse(self.content))
+        wrapped = XMLTEMPLATE % self.content
+        sources = [
+            self.content.encode('utf8'),
+            io.StringIO(self.content),
+            io.BytesIO(self.content.encode('utf8')),
+            io.BytesIO(wrapped.encode('utf8')),
+            wrapped,
+            pathlib.Path(TESTDATA),
+        ]
+        for source in sources:
+            self.assertEqual(list(Parser().iterparse(source)), expected)
+
+    def test_is_lazy(self):
+        records = Parser().iterparse(XML_UNKNOWN_RECORD)
+        assert next(records)[0] == 'language'
+        assert next(records)[0] == 'lexicon'
+        with self.assertRaises(ValueError):
+            next(records)
+
+    def test_string_is_streamed(self):
+        # the broken record is beyond the first chunk, so isn't read until
+        # the records before it have been yielded.
+        with codecs.open(TESTDATA, 'r', encoding='utf8') as handle:
+            content = handle.read()
+        lexicon = "<record>%s</record>" % "".join("<%s>1</%s>" % (k, k) for k in LEX)
+        content += lexicon * (2 * CHUNKSIZE // len(lexicon)) + '<record><id></item>'
+        for source in (content, content.encode('utf8')):
+            records = Parser().iterparse(source)
+            assert next(records)[0] == 'language'
+            with self.assertRaises(SyntaxError):
+                list(records)
+
+    def test_empty(self):
+        self.assertEqual(list(Parser().iterparse("")), [])
+
+
+class Test_Schemas(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with codecs.open(TESTDATA, 'r', encoding='utf8') as handle:
+            cls.content = handle.read()
+
+    def test_classify(self):
+        self.assertEqual(Parser().classify(LNG), 'language')
+        self.assertEqual(Parser().classify(LOC), 'location')
+        self.assertEqual(Parser().classify(LEX), 'lexicon')
+        # extra fields still match
+        self.assertEqual(Parser().classify(dict(LEX, extra='x')), 'lexicon')
+        with self.assertRaises(ValueError):
+            Parser().classify({'id': '1'})
+
+    def test_language_first(self):
+        # a record with the keys of both is a language, as before.
+        self.assertEqual(Parser().classify(dict(LEX, **LNG)), 'language')
+
+    def test_typed(self):
+        result = Parser(typed=True).parse(self.content)
+        assert result['language']['id'] == 99
+        assert result['lexicon'][0]['id'] == 99
+        assert result['lexicon'][0]['word_id'] == 1
+        assert result['lexicon'][0]['cognacy'] == '1'
+        self.assertAlmostEqual(result['location']['latitude'], -21.534847002)
+
+    def test_untyped(self):
+        result = Parser().parse(self.content)
+        assert result['language']['id'] == '99'
+        assert result['lexicon'][0]['word_id'] == '1'
+
+    def test_register_schema(self):
+        class SourceParser(Parser):
+            pass
+        SourceParser.register_schema('source', ['source_id', 'reference'], {'source_id': int})
+        record = {'source_id': '3', 'reference': 'Blust 1980'}
+        self.assertEqual(
+            SourceParser(typed=True).convert(record),
+            ('source', {'source_id': 3, 'reference': 'Blust 1980'})
+        )
+        # the base parser is unchanged
+        with self.assertRaises(ValueError):
+            Parser().classify(record)
+
+    def test_registered_kinds_are_kept(self):
+        class SourceParser(Parser):
+            pass
+        SourceParser.register_schema('source', ['source_id', 'reference'])
+        source = "<record><source_id>3</source_id><reference>Blust 1980</reference></record>"
+        result = SourceParser().parse(self.content + source)
+        assert result['location'] == Parser().parse(self.content)['location']
+        self.assertEqual(result['source'], [{'source_id': '3', 'reference': 'Blust 1980'}])
+        assert len(result['lexicon']) == 4
+
+    def test_subclass_cache(self):
+        class LexiconParser(Parser):
+            schemas = [LEXICON_SCHEMA]
+        record = dict(LEX, **LNG)
+        self.assertEqual(Parser().classify(record), 'language')
+        self.assertEqual(LexiconParser().classify(record), 'lexicon')
@@ -1,6 +1,10 @@
+import os
 import unittest
 
-from abvd import Record
+from abvd import ABVDatabase, Language, Record
+from abvd.ABVD import get_language
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.json')
 
 class TestRecord(unittest.TestCase):
     
@@ -42,3 +46,36 @@ class TestRecord(unittest.TestCase):
        r = Record(ID=1, WID=2, LID=3, Language='English', Word='Hand', Item='hand', Annotation='?', Cognacy=None, Loan="L")
        repr(r)
       
+
+
+class TestLanguage(unittest.TestCase):
+    def test_shared(self):
+        a = Record(ID=1, LID=3, Language='English')
+        b = Record(ID=2, LID=3, Language='English')
+        assert a.language is b.language
+        assert a.language is not Record(ID=3, LID=4, Language='English').language
+
+    def test_taxon(self):
+        language = Language(583, 'Arosi (Oneibia Village)')
+        assert language.taxon == "Arosi_Oneibia_Village_583"
+        assert Language(None, 'English').taxon == 'English'
+
+    def test_record_language(self):
+        language = get_language(1502, 'Wamoaŋ')
+        r = Record(ID=1, WID=2, language=language)
+        assert r.LID == 1502
+        assert r.Language == 'Wamoaŋ'
+        assert r.get_taxon() == "Wamoang_1502"
+
+    def test_set(self):
+        r = Record(ID=1, LID=3, Language='English')
+        r.LID = 4
+        r.Language = 'German'
+        assert (r.LID, r.Language) == (4, 'German')
+        assert r.get_taxon() == 'German_4'
+        assert r.language is get_language(4, 'German')
+
+    def test_database_shares_languages(self):
+        for db in (ABVDatabase(files=[TESTDATA]), ABVDatabase(files=[TESTDATA], compact=True)):
+            languages = {id(r.language) for r in db.process()}
+            assert len(languages) == 1
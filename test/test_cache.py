@@ -0,0 +1,165 @@
+import os
+import time
+import shutil
+import codecs
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+from abvd import Downloader, InvalidLanguageError
+from abvd.cache import DiskCache
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = DiskCache(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_invalid_eviction(self):
+        with self.assertRaises(ValueError):
+            DiskCache(self.tmpdir, eviction='random')
+
+    def test_missing(self):
+        assert self.cache.get('austronesian', 1) is None
+
+    def test_put_get(self):
+        self.cache.put('austronesian', 1, '<record/>', etag='"abc"', last_modified='yesterday')
+        entry = self.cache.get('austronesian', 1)
+        assert entry['content'] == '<record/>'
+        assert entry['etag'] == '"abc"'
+        assert entry['last_modified'] == 'yesterday'
+        assert self.cache.get('bantu', 1) is None
+
+    def test_is_fresh(self):
+        self.cache.put('austronesian', 1, '<record/>')
+        entry = self.cache.get('austronesian', 1)
+        assert self.cache.is_fresh(entry)
+        assert not DiskCache(self.tmpdir, max_age=0).is_fresh(entry)
+        entry['fetched'] = time.time() - 100
+        assert not DiskCache(self.tmpdir, max_age=60).is_fresh(entry)
+
+    def test_touch(self):
+        self.cache.put('austronesian', 1, '<record/>')
+        before = self.cache.get('austronesian', 1)['fetched']
+        time.sleep(0.01)
+        self.cache.touch('austronesian', 1)
+        assert self.cache.get('austronesian', 1)['fetched'] > before
+
+    def test_evict_lru(self):
+        cache = DiskCache(self.tmpdir, max_size=20, eviction='lru')
+        cache.put('austronesian', 1, 'a' * 10)
+        time.sleep(0.01)
+        cache.put('austronesian', 2, 'b' * 10)
+        time.sleep(0.01)
+        cache.get('austronesian', 1)  # 2 is now least recently used
+        time.sleep(0.01)
+        cache.put('austronesian', 3, 'c' * 10)
+        assert cache.get('austronesian', 1) is not None
+        assert cache.get('austronesian', 2) is None
+        assert cache.get('austronesian', 3) is not None
+        assert cache.size() == 20
+
+    def test_evict_fifo(self):
+        cache = DiskCache(self.tmpdir, max_size=20, eviction='fifo')
+        cache.put('austronesian', 1, 'a' * 10)
+        time.sleep(0.01)
+        cache.put('austronesian', 2, 'b' * 10)
+        time.sleep(0.01)
+        cache.get('austronesian', 1)
+        cache.put('austronesian', 3, 'c' * 10)
+        assert cache.get('austronesian', 1) is None
+        assert cache.get('austronesian', 2) is not None
+
+    def test_size_is_tracked(self):
+        cache = DiskCache(self.tmpdir, max_size=100)
+        cache.put('austronesian', 1, 'a' * 10)
+        with mock.patch.object(cache, 'entries', wraps=cache.entries) as entries:
+            for i in range(2, 8):
+                cache.put('austronesian', i, 'b' * 10)
+            cache.put('austronesian', 1, 'a' * 20)
+            cache.delete('austronesian', 2)
+            assert entries.call_count == 0
+        assert cache.size() == 70
+        assert DiskCache(self.tmpdir).size() == 70
+
+    def test_get_does_not_rewrite(self):
+        self.cache.put('austronesian', 1, '<record/>')
+        metafile = os.path.join(self.tmpdir, 'austronesian', '1.json')
+        with open(metafile, encoding='utf8') as handle:
+            before = handle.read()
+        os.utime(metafile, (0, 0))
+        entry = self.cache.get('austronesian', 1)
+        with open(metafile, encoding='utf8') as handle:
+            assert handle.read() == before
+        assert os.stat(metafile).st_mtime == entry['accessed']
+
+    def test_clear(self):
+        self.cache.put('austronesian', 1, '<record/>')
+        self.cache.clear()
+        assert self.cache.get('austronesian', 1) is None
+
+
+class TestDownloaderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        with codecs.open(TESTDATA, 'r', encoding='utf8') as handle:
+            self.content = handle.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_no_cache(self):
+        assert Downloader('austronesian').get_cached(99) == (None, {})
+
+    def test_cache_from_directory(self):
+        d = Downloader('austronesian', cache=self.tmpdir, max_age=10, eviction='fifo')
+        assert isinstance(d.cache, DiskCache)
+        assert d.cache.max_age == 10
+        assert d.cache.eviction == 'fifo'
+
+    def test_get_from_cache(self):
+        d = Downloader('austronesian', cache=self.tmpdir)
+        d.cache.put('austronesian', 99, self.content)
+        assert d.get(99, raw=True) == self.content
+        assert d.get(99)['language']['language'] == 'Nengone'
+
+    def test_revalidation_headers(self):
+        d = Downloader('austronesian', cache=self.tmpdir, max_age=0)
+        d.cache.put('austronesian', 99, self.content, etag='"abc"', last_modified='yesterday')
+        content, headers = d.get_cached(99)
+        assert content is None
+        assert headers == {'If-None-Match': '"abc"', 'If-Modified-Since': 'yesterday'}
+
+    def test_handle_response_stores(self):
+        d = Downloader('austronesian', cache=self.tmpdir)
+        response = httpx.Response(200, content=self.content.encode('utf8'), headers={'ETag': '"abc"'})
+        assert d.handle_response(99, response) == self.content
+        assert d.cache.get('austronesian', 99)['etag'] == '"abc"'
+
+    def test_handle_response_not_modified(self):
+        d = Downloader('austronesian', cache=self.tmpdir, max_age=0)
+        d.cache.put('austronesian', 99, self.content)
+        assert d.handle_response(99, httpx.Response(304)) == self.content
+
+    def test_handle_response_empty(self):
+        d = Downloader('austronesian', cache=self.tmpdir)
+        with self.assertRaises(InvalidLanguageError):
+            d.handle_response(99, httpx.Response(200, content=b''))
+        with self.assertRaises(InvalidLanguageError):
+            d.handle_response(99, httpx.Response(200, content=b'null\n'))
+        assert d.cache.get('austronesian', 99) is None
+
+    def test_handle_response_error(self):
+        d = Downloader('austronesian', cache=self.tmpdir)
+        request = httpx.Request('GET', d.make_url(99))
+        response = httpx.Response(503, content=b'<html>Service Unavailable</html>', request=request)
+        with self.assertRaises(httpx.HTTPStatusError):
+            d.handle_response(99, response)
+        assert d.cache.get('austronesian', 99) is None
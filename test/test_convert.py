@@ -0,0 +1,69 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from abvd import ABVDatabase
+from abvd.convert import convert, convert_file, is_stale
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+class TestConvert(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.input = self.tmpdir / 'xml'
+        self.output = self.tmpdir / 'json'
+        self.input.mkdir()
+        shutil.copy(TESTDATA, self.input / '99.xml')
+        with open(self.input / '100.xml', 'w') as handle:
+            handle.write("<record><something>y</something></record>")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_convert_file(self):
+        target = self.tmpdir / '99.json'
+        convert_file(self.input / '99.xml', target)
+        with open(target, encoding='utf8') as handle:
+            content = json.load(handle)
+        assert content['language']['language'] == 'Nengone'
+        assert len(content['lexicon']) == 4
+
+    def test_convert_file_interrupted(self):
+        target = self.tmpdir / '99.json'
+        with mock.patch('abvd.download_fast.os.replace', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                convert_file(self.input / '99.xml', target)
+        assert not target.exists()
+        assert list(self.tmpdir.glob('*.tmp')) == []
+
+    def test_is_stale(self):
+        target = self.tmpdir / '99.json'
+        assert is_stale(self.input / '99.xml', target)
+        convert_file(self.input / '99.xml', target)
+        assert not is_stale(self.input / '99.xml', target)
+
+    def test_convert(self):
+        results = {s.name: status for s, t, status in convert(self.input, self.output, processes=1)}
+        assert results['99.xml'] == 'ok'
+        assert results['100.xml'].startswith('Error')
+        db = ABVDatabase(files=[str(self.output / '99.json')])
+        assert len(db.process()) == 4
+
+    def test_convert_pool(self):
+        results = {s.name: status for s, t, status in convert(self.input, self.output, processes=2)}
+        assert results['99.xml'] == 'ok'
+        assert results['100.xml'].startswith('Error')
+
+    def test_skips_up_to_date(self):
+        list(convert(self.input, self.output, processes=1))
+        results = {s.name: status for s, t, status in convert(self.input, self.output, processes=1)}
+        assert results['99.xml'] == 'skipped'
+        # failed files are retried
+        assert results['100.xml'].startswith('Error')
+        results = {s.name: status for s, t, status in convert(self.input, self.output, processes=1, force=True)}
+        assert results['99.xml'] == 'ok'
@@ -0,0 +1,93 @@
+import math
+import random
+import tempfile
+import unittest
+
+from abvd import Record
+from abvd.distance import Distances, pairwise, offset, _blocks
+from abvd.matrix import CognateMatrix, MISSING, PRESENT
+
+from test.test_matrix import RECORDS
+
+
+def reference(matrix, a, b):
+    """Distance from the matrix rows directly."""
+    ra, rb = matrix.rows[a], matrix.rows[b]
+    words = {}
+    for i, (wid, _) in enumerate(matrix.characters):
+        words.setdefault(wid, []).append(i)
+    comparable = shared = 0
+    for columns in words.values():
+        if ra[columns[0]] == MISSING or rb[columns[0]] == MISSING:
+            continue
+        comparable += 1
+        shared += any(ra[i] == PRESENT and rb[i] == PRESENT for i in columns)
+    return 1 - shared / comparable if comparable else math.nan
+
+
+def random_records(nlanguages, nwords, seed=1):
+    rng = random.Random(seed)
+    records, rid = [], 0
+    for lid in range(1, nlanguages + 1):
+        for wid in range(1, nwords + 1):
+            if rng.random() < 0.2:
+                continue
+            rid += 1
+            # word 1 has many cognate sets to get wide fields.
+            ncog = 40 if wid == 1 else 4
+            cognacy = ",".join(str(rng.randint(1, ncog)) for _ in range(rng.randint(1, 2)))
+            records.append(Record(ID=rid, LID=lid, WID=wid, Language='L', Word='w', Cognacy=cognacy))
+    return records
+
+
+class TestPairwise(unittest.TestCase):
+    def test_distances(self):
+        records = RECORDS + [Record(ID=8, LID=4, WID=3, Language='D', Word='eye', Cognacy='1')]
+        d = pairwise(CognateMatrix.from_records(records), processes=1)
+        self.assertEqual(d.taxa, ['A_1', 'B_2', 'C_3', 'D_4'])
+        self.assertEqual(len(d), 6)
+        self.assertEqual(d.get('A_1', 'B_2'), 0.5)
+        self.assertEqual(d.get('B_2', 'A_1'), 0.5)
+        self.assertEqual(d.get('A_1', 'C_3'), 1.0)
+        self.assertEqual(d.get('A_1', 'A_1'), 0.0)
+        # no words in common.
+        assert math.isnan(d.get('A_1', 'D_4'))
+
+    def test_against_reference(self):
+        m = CognateMatrix.from_records(random_records(25, 30))
+        d = pairwise(m, processes=1, blocks=7)
+        for i, a in enumerate(m.taxa):
+            for b in m.taxa[i + 1:]:
+                self.assertAlmostEqual(d.get(a, b), reference(m, a, b))
+
+    def test_processes(self):
+        m = CognateMatrix.from_records(random_records(20, 10))
+        serial = pairwise(m, processes=1)
+        parallel = pairwise(m, processes=2, blocks=5)
+        self.assertEqual(list(serial.values), list(parallel.values))
+
+    def test_mmap(self):
+        m = CognateMatrix.from_records(random_records(10, 10))
+        with tempfile.NamedTemporaryFile(suffix='.bin') as out:
+            d = pairwise(m, processes=1, filename=out.name)
+            expected = list(pairwise(m, processes=1).values)
+            self.assertEqual(list(d.values), expected)
+            d.close()
+            assert len(out.read()) == 8 * len(expected)
+
+    def test_empty(self):
+        d = pairwise(CognateMatrix.from_records([]), processes=1)
+        assert isinstance(d, Distances)
+        self.assertEqual(len(d), 0)
+
+
+class TestHelpers(unittest.TestCase):
+    def test_offset(self):
+        self.assertEqual([offset(i, 4) for i in range(4)], [0, 3, 5, 6])
+
+    def test_blocks(self):
+        for n in (0, 1, 2, 10, 33):
+            for nblocks in (1, 3, 8):
+                blocks = _blocks(n, nblocks)
+                rows = [i for start, stop in blocks for i in range(start, stop)]
+                self.assertEqual(rows, list(range(n)))
@@ -0,0 +1,213 @@
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from abvd.ABVD import XMLTEMPLATE
+from abvd.sync import ChangeReport
+from abvd.download_fast import fetch_all, get_backoff, write_atomic, Manifest, RateLimiter
+
+
+def collect(agen):
+    async def run():
+        return [r async for r in agen]
+    return asyncio.run(run())
+
+
+class Handler(object):
+    """
+    Serves language 1, returns nothing for 2, fails 3 the first two times,
+    rate limits 7 the first time, and always fails 4 (500) and 6 (404).
+    """
+    def __init__(self):
+        self.calls = {}
+
+    def __call__(self, request):
+        self.database = request.url.params['section']
+        language = int(request.url.params['language'])
+        self.calls[language] = self.calls.get(language, 0) + 1
+        if language == 1:
+            return httpx.Response(200, text="<record><id>1</id></record>")
+        elif language == 3 and self.calls[language] == 1:
+            raise httpx.ReadTimeout("timeout", request=request)
+        elif language == 3 and self.calls[language] == 2:
+            return httpx.Response(503)
+        elif language == 3:
+            return httpx.Response(200, text="<record><id>3</id></record>")
+        elif language == 4:
+            return httpx.Response(500)
+        elif language == 6:
+            return httpx.Response(404, text="<html>Not Found</html>")
+        elif language == 7 and self.calls[language] == 1:
+            return httpx.Response(429, text="Too Many Requests")
+        elif language == 7:
+            return httpx.Response(200, text="<record><id>7</id></record>")
+        return httpx.Response(200, text="")
+
+
+class TestFetchAll(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.handler = Handler()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def fetch(self, ids, **kwargs):
+        kwargs.setdefault('backoff', 0)
+        results = collect(fetch_all(
+            ids, self.tmpdir, transport=httpx.MockTransport(self.handler), **kwargs
+        ))
+        return {abvd_id: status for abvd_id, url, status in results}
+
+    def test_fetch(self):
+        results = self.fetch([1, 2], workers=2)
+        self.assertEqual(results, {1: 200, 2: 'no content'})
+        assert (self.tmpdir / '1.xml').exists()
+        assert not (self.tmpdir / '2.xml').exists()
+        with open(self.tmpdir / '1.xml') as handle:
+            assert handle.read().startswith('<?xml')
+
+    def test_retries(self):
+        results = self.fetch([3], retries=2)
+        assert results[3] == 200
+        assert self.handler.calls[3] == 3
+
+    def test_rate_limited(self):
+        results = self.fetch([7], retries=2)
+        assert results[7] == 200
+        assert self.handler.calls[7] == 2
+
+    def test_gives_up(self):
+        results = self.fetch([4], retries=2)
+        assert results[4] == 'Error: HTTP 500'
+        assert self.handler.calls[4] == 3
+        results = self.fetch([3], retries=0)
+        assert results[3].startswith('Error: ReadTimeout')
+
+    def test_client_error(self):
+        manifest = Manifest(self.tmpdir)
+        results = self.fetch([6], manifest=manifest)
+        assert results[6] == 'Error: HTTP 404'
+        assert self.handler.calls[6] == 1
+        assert not (self.tmpdir / '6.xml').exists()
+        assert manifest.entries[6]['status'] == 'failed'
+        assert not manifest.is_done(6)
+
+    def test_database(self):
+        self.fetch([1], database='bantu')
+        assert self.handler.database == 'bantu'
+
+    def test_manifest(self):
+        manifest = Manifest(self.tmpdir)
+        self.fetch([1, 2, 4], retries=0, manifest=manifest)
+        manifest.save()
+        manifest = Manifest(self.tmpdir)
+        assert manifest.entries[1]['status'] == 'ok'
+        assert manifest.entries[1]['size'] == os.path.getsize(self.tmpdir / '1.xml')
+        assert len(manifest.entries[1]['sha256']) == 64
+        assert manifest.entries[2]['status'] == 'missing'
+        assert manifest.entries[4]['status'] == 'failed'
+        assert manifest.entries[4]['error'] == 'Error: HTTP 500'
+        self.assertEqual(manifest.summary(), {'ok': 1, 'missing': 1, 'failed': 1})
+
+    def test_sync(self):
+        manifest = Manifest(self.tmpdir)
+        self.fetch([1], manifest=manifest)
+        write_atomic(self.tmpdir / '2.xml', XMLTEMPLATE % '<record></record>')
+        write_atomic(self.tmpdir / '3.xml', XMLTEMPLATE % '<record></record>')
+        mtime = os.path.getmtime(self.tmpdir / '1.xml')
+
+        report = ChangeReport()
+        results = self.fetch([1, 2, 3, 5], manifest=manifest, report=report)
+        self.assertEqual(results, {1: 'unchanged', 2: 'no content', 3: 200, 5: 'no content'})
+        assert os.path.getmtime(self.tmpdir / '1.xml') == mtime
+        assert (self.tmpdir / '2.xml').exists()  # reported, but not deleted
+        assert report.unchanged == [1]
+        assert report.removed == [2]
+        assert list(report.changed) == [3]
+        assert report.new == []
+        assert manifest.entries[2]['status'] == 'missing'
+
+    def test_sync_new(self):
+        report = ChangeReport()
+        self.fetch([1], report=report)
+        assert report.new == [1]
+
+    def test_many(self):
+        results = self.fetch(range(5, 105), workers=4)
+        assert len(results) == 100
+
+    def test_rate(self):
+        limiter = RateLimiter(100)
+        async def run():
+            for i in range(5):
+                await limiter.wait()
+        start = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - start >= 0.035
+
+
+class TestHelpers(unittest.TestCase):
+    def test_get_backoff(self):
+        for attempt in range(5):
+            assert 0 <= get_backoff(attempt, 1) <= 2 ** attempt
+        assert get_backoff(50, 1) <= 60
+
+    def test_write_atomic(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, '1.xml')
+            write_atomic(filename, 'ŋ')
+            write_atomic(filename, 'ŋŋ')
+            with open(filename, encoding='utf8') as handle:
+                assert handle.read() == 'ŋŋ'
+            assert os.listdir(tmpdir) == ['1.xml']
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_is_done(self):
+        manifest = Manifest(self.tmpdir)
+        write_atomic(self.tmpdir / '1.xml', 'abc')
+        manifest.add(1, 'ok', b'abc')
+        manifest.add(2, 'missing')
+        manifest.add(3, 'failed', error='Error')
+        assert manifest.is_done(1)
+        assert manifest.is_done(2)
+        assert not manifest.is_done(2, recheck_missing=True)
+        assert not manifest.is_done(3)
+        assert not manifest.is_done(4)
+
+    def test_truncated_file_is_not_done(self):
+        manifest = Manifest(self.tmpdir)
+        manifest.add(1, 'ok', b'abcdef')
+        write_atomic(self.tmpdir / '1.xml', 'abc')
+        assert not manifest.is_done(1)
+        os.unlink(self.tmpdir / '1.xml')
+        assert not manifest.is_done(1)
+
+    def test_adopts_complete_files(self):
+        write_atomic(self.tmpdir / '1.xml', XMLTEMPLATE % '<record></record>')
+        write_atomic(self.tmpdir / '2.xml', (XMLTEMPLATE % '<record></record>')[:-5])
+        manifest = Manifest(self.tmpdir)
+        assert manifest.is_done(1)
+        assert not manifest.is_done(2)
+
+    def test_saves_periodically(self):
+        manifest = Manifest(self.tmpdir)
+        for i in range(Manifest.save_every):
+            manifest.add(i, 'missing')
+        assert len(Manifest(self.tmpdir).entries) == Manifest.save_every
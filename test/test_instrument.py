@@ -0,0 +1,74 @@
+import os
+import json
+import tempfile
+import unittest
+
+from abvd import ABVDatabase, Downloader, instrument
+from abvd.mock import MockABVD
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.json')
+TESTXML = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        instrument.reset()
+        instrument.enable()
+
+    def tearDown(self):
+        instrument.enable(False)
+        instrument.reset()
+
+    def test_disabled(self):
+        instrument.enable(False)
+        instrument.count('a')
+        instrument.observe('b', 1.0)
+        with instrument.timer('c'):
+            pass
+        self.assertEqual(instrument.stats(), {'counters': {}, 'timers': {}})
+
+    def test_count(self):
+        instrument.count('a')
+        instrument.count('a', 4)
+        self.assertEqual(instrument.stats()['counters'], {'a': 5})
+
+    def test_observe(self):
+        for v in (0.002, 0.004, 2.0):
+            instrument.observe('t', v)
+        t = instrument.stats()['timers']['t']
+        assert t['count'] == 3
+        self.assertAlmostEqual(t['mean'], 2.006 / 3)
+        assert t['min'] == 0.002 and t['max'] == 2.0
+        self.assertEqual(t['buckets'], {'<=0.005': 2, '<=5': 1})
+
+    def test_timer(self):
+        with instrument.timer('t'):
+            pass
+        assert instrument.stats()['timers']['t']['count'] == 1
+        assert 't' in instrument.summary()
+
+    def test_save(self):
+        instrument.count('a')
+        with tempfile.NamedTemporaryFile(suffix='.json') as out:
+            instrument.save(out.name)
+            self.assertEqual(json.load(out)['counters'], {'a': 1})
+
+    def test_downloader(self):
+        mock = MockABVD(languages={
+            ('austronesian', 1): open(TESTXML, encoding='utf8').read()
+        })
+        Downloader('austronesian', transport=mock.transport()).get(1)
+        s = instrument.stats()
+        assert s['counters']['download.requests'] == 1
+        assert s['counters']['download.bytes'] > 0
+        assert s['timers']['download.request']['count'] == 1
+        assert s['timers']['parse']['count'] == 1
+        assert s['counters']['parse.records'] == 6
+
+    def test_database(self):
+        ABVDatabase(files=[TESTDATA]).process()
+        s = instrument.stats()
+        assert s['counters']['load.files'] == 1
+        assert s['timers']['load']['count'] == 1
+        assert s['timers']['process']['count'] == 1
+        assert s['timers']['process.file']['count'] == 1
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from abvd import ABVDatabase, Record
+from abvd.matrix import CognateMatrix
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.json')
+
+RECORDS = [
+    Record(ID=1, LID=1, WID=1, Language='A', Word='hand', Cognacy='1'),
+    Record(ID=2, LID=1, WID=2, Language='A', Word='leg/foot', Cognacy='1,2'),
+    Record(ID=3, LID=2, WID=1, Language='B', Word='hand', Cognacy='10'),
+    Record(ID=4, LID=2, WID=2, Language='B', Word='leg/foot', Cognacy='2?'),
+    Record(ID=5, LID=3, WID=1, Language='C', Word='hand', Cognacy='1', Loan='L'),
+    Record(ID=6, LID=3, WID=2, Language='C', Word='leg/foot', Cognacy=None),
+    Record(ID=7, LID=3, WID=2, Language='C', Word='leg/foot', Cognacy='3'),
+]
+
+
+class TestCognateMatrix(unittest.TestCase):
+    def test_defaults(self):
+        m = CognateMatrix.from_records(RECORDS)
+        self.assertEqual(m.taxa, ['A_1', 'B_2', 'C_3'])
+        self.assertEqual(m.characters, [(1, '1'), (1, '10'), (2, '1'), (2, '2'), (2, '3')])
+        self.assertEqual(m.labels, ['hand_1', 'hand_10', 'leg_foot_1', 'leg_foot_2', 'leg_foot_3'])
+        self.assertEqual(m.get_row('A_1'), '10110')
+        self.assertEqual(m.get_row('B_2'), '01010')
+        # loan excluded so hand is missing for C.
+        self.assertEqual(m.get_row('C_3'), '??001')
+
+    def test_loans(self):
+        m = CognateMatrix.from_records(RECORDS, loans=True)
+        self.assertEqual(m.get_row('C_3'), '10001')
+
+    def test_uncertain(self):
+        m = CognateMatrix.from_records(RECORDS, uncertain=False)
+        # B's only foot coding is uncertain, so it is missing.
+        self.assertEqual(m.get_row('B_2'), '01???')
+        self.assertEqual(m.get_row('A_1'), '10110')
+
+    def test_singletons(self):
+        m = CognateMatrix.from_records(RECORDS, singletons=True)
+        assert (2, 'u6') in m.characters
+        self.assertEqual(m.get_row('C_3'), '??0011')
+        self.assertEqual(m.get_row('A_1'), '101100')
+
+    def test_from_database(self):
+        m = CognateMatrix.from_database(ABVDatabase(files=[TESTDATA]))
+        self.assertEqual(m.taxa, ['Nengone_99'])
+        assert m.nchar == 3
+        self.assertEqual(m.get_row('Nengone_99'), '111')
+
+    def test_write_nexus(self):
+        m = CognateMatrix.from_records(RECORDS)
+        with tempfile.NamedTemporaryFile(suffix='.nex') as out:
+            m.write_nexus(out.name)
+            content = out.read().decode('utf8')
+        assert content.startswith('#NEXUS')
+        assert 'DIMENSIONS NTAX=3 NCHAR=5;' in content
+        assert '        5 leg_foot_3\n' in content
+        assert '    A_1  10110\n' in content
+        assert '    C_3  ??001\n' in content
+        assert content.rstrip().endswith('END;')
+
+    def test_write_phylip(self):
+        m = CognateMatrix.from_records(RECORDS)
+        with tempfile.NamedTemporaryFile(suffix='.phy') as out:
+            m.write_phylip(out.name)
+            lines = out.read().decode('utf8').splitlines()
+        self.assertEqual(lines, ['3 5', 'A_1  10110', 'B_2  01010', 'C_3  ??001'])
@@ -0,0 +1,114 @@
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from abvd import Downloader, InvalidLanguageError
+from abvd.download_fast import fetch_all
+from abvd.mock import MockABVD, unwrap
+from abvd.synthetic import make_language, make_meanings, to_xml
+
+TESTXML = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+def collect(agen):
+    async def run():
+        return [r async for r in agen]
+    return asyncio.run(run())
+
+
+class TestMockABVD(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(cls.tmpdir, 'bantu'))
+        shutil.copy(TESTXML, os.path.join(cls.tmpdir, '99.xml'))
+        cls.entities = make_language(5, make_meanings(10))
+        with open(os.path.join(cls.tmpdir, 'bantu', '5.xml'), 'w', encoding='utf8') as handle:
+            handle.write(to_xml(cls.entities))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_unwrap(self):
+        records = to_xml(self.entities, wrap=False)
+        self.assertEqual(unwrap(to_xml(self.entities)), records.strip())
+        self.assertEqual(unwrap(records), records)
+
+    def test_transport(self):
+        d = Downloader('austronesian', transport=MockABVD(self.tmpdir).transport())
+        self.assertEqual(d.get(99)['language']['language'], 'Nengone')
+        with self.assertRaises(InvalidLanguageError):
+            d.get(100)
+
+    def test_database_directory(self):
+        mock = MockABVD(self.tmpdir)
+        self.assertEqual(Downloader('bantu', transport=mock.transport()).get(5), self.entities)
+        # other databases fall back to the top level only
+        with self.assertRaises(InvalidLanguageError):
+            Downloader('mayan', transport=mock.transport()).get(5)
+
+    def test_languages(self):
+        mock = MockABVD(languages={('mayan', 1): to_xml(self.entities)})
+        self.assertEqual(Downloader('mayan', transport=mock.transport()).get(1), self.entities)
+
+    def test_errors(self):
+        mock = MockABVD(self.tmpdir, error_rate=1.0)
+        response = httpx.Client(transport=mock.transport()).get(
+            Downloader('austronesian').make_url(99)
+        )
+        assert response.status_code == 500
+
+    def test_empty(self):
+        mock = MockABVD(self.tmpdir, empty_rate=1.0)
+        with self.assertRaises(InvalidLanguageError):
+            Downloader('austronesian', transport=mock.transport()).get(99)
+
+    def test_bad_requests(self):
+        mock = MockABVD(self.tmpdir)
+        self.assertEqual(mock.respond('http://x/utils/save/?type=xml')[0], 400)
+        self.assertEqual(mock.respond('http://x/other/?section=bantu&language=5')[0], 404)
+        self.assertEqual(mock.respond('http://x/utils/save/?section=klingon&language=5')[0], 404)
+
+    def test_latency_and_bandwidth(self):
+        mock = MockABVD(self.tmpdir, latency=0.5, bandwidth=1000)
+        status, body, delay = mock.respond(Downloader('austronesian').make_url(99))
+        assert status == 200
+        self.assertAlmostEqual(delay, 0.5 + len(body) / 1000)
+
+    def test_server(self):
+        mock = MockABVD(self.tmpdir)
+        with mock.serve() as server:
+            assert server.url.startswith('http://127.0.0.1:')
+            d = Downloader('bantu', url=server.url)
+            self.assertEqual(d.get(5), self.entities)
+            with self.assertRaises(InvalidLanguageError):
+                d.get(6)
+        assert mock.requests == 2
+
+    def test_server_overhead(self):
+        with MockABVD(self.tmpdir).serve() as server:
+            with Downloader('bantu', url=server.url) as d:
+                d.get(5, raw=True)  # open the connection
+                start = time.perf_counter()
+                for _ in range(20):
+                    d.get(5, raw=True)
+                elapsed = (time.perf_counter() - start) / 20
+        assert elapsed < 0.01, "%.1fms per request" % (elapsed * 1000)
+
+    def test_fetch_all(self):
+        mock = MockABVD(self.tmpdir)
+        outputdir = Path(tempfile.mkdtemp())
+        try:
+            with mock.serve() as server:
+                results = collect(fetch_all([5, 6], outputdir, database='bantu', workers=2, url=server.url))
+            self.assertEqual(sorted((r[0], r[2]) for r in results), [(5, 200), (6, 'no content')])
+            assert (outputdir / '5.xml').exists()
+        finally:
+            shutil.rmtree(outputdir)
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from abvd import ABVDatabase
+from abvd.packed import PackedCorpus
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.json')
+TESTXML = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+def as_tuple(r):
+    return (r.ID, r.LID, r.WID, r.Language, r.Word, r.Item, r.Annotation, r.Loan, r.Cognacy)
+
+
+class TestPacked(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.filename = os.path.join(cls.tmpdir, 'corpus.abvdpack')
+        cls.original = ABVDatabase(files=[TESTDATA])
+        cls.original.save_packed(cls.filename)
+        cls.db = ABVDatabase.open_packed(cls.filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.corpus.close()
+        shutil.rmtree(cls.tmpdir)
+
+    def test_files(self):
+        self.assertEqual(list(self.db.files), [TESTDATA])
+
+    def test_get_details(self):
+        d = self.db.get_details(TESTDATA)
+        assert d['id'] == '99'
+        assert d['language'] == 'Nengone'
+        assert d['glottocode'] == 'neng1238'
+        assert d['notes'] is None
+
+    def test_get_location(self):
+        self.assertEqual(
+            self.db.get_location(TESTDATA),
+            self.original.get_location(TESTDATA)
+        )
+
+    def test_lexicon(self):
+        self.assertEqual(
+            self.db.files[TESTDATA]['lexicon'],
+            self.original.files[TESTDATA]['lexicon']
+        )
+
+    def test_process(self):
+        self.assertEqual(
+            [as_tuple(r) for r in self.db.process()],
+            [as_tuple(r) for r in self.original.process()]
+        )
+        assert self.db.get_nlexemes(TESTDATA) == 4
+
+    def test_save_details(self):
+        with tempfile.NamedTemporaryFile() as out:
+            self.db.save_details(out.name)
+            out.seek(0)
+            assert len(out.readlines()) == 2
+
+    def test_from_xml_and_lazy(self):
+        filename = os.path.join(self.tmpdir, 'mixed.abvdpack')
+        db = ABVDatabase(lazy=True)
+        db.load(TESTDATA)
+        db.load_xml(TESTXML)
+        db.save_packed(filename)
+        packed = ABVDatabase.open_packed(filename)
+        assert len(packed.files) == 2
+        self.assertEqual(
+            [as_tuple(r) for r in packed.process()],
+            [as_tuple(r) for r in db.process()]
+        )
+        packed.corpus.close()
+
+    def test_not_packed(self):
+        with self.assertRaises(ValueError):
+            PackedCorpus(TESTDATA)
+
+    def test_can_add_files(self):
+        db = ABVDatabase.open_packed(self.filename)
+        db.load_xml(TESTXML)
+        assert len(db.process()) == 8
+        db.corpus.close()
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from abvd import ABVDatabase
+from abvd.sqlite import SQLiteDatabase
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.json')
+TESTXML = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+def as_tuple(r):
+    return (r.ID, r.LID, r.WID, r.Language, r.Word, r.Item, r.Annotation, r.Loan, r.Cognacy)
+
+
+class TestSQLite(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.original = ABVDatabase(files=[TESTDATA])
+        cls.db = SQLiteDatabase(files=[TESTDATA, TESTXML])
+
+    def test_files(self):
+        self.assertEqual(list(self.db.files), [TESTDATA, TESTXML])
+        assert TESTDATA in self.db.files
+        assert 'x.json' not in self.db.files
+        assert len(self.db.files) == 2
+
+    def test_get_details(self):
+        d = self.db.get_details(TESTDATA)
+        assert d['id'] == '99'
+        assert d['language'] == 'Nengone'
+        assert d['glottocode'] == 'neng1238'
+        assert d['filename'] == TESTDATA
+        with self.assertRaises(ValueError):
+            self.db.get_details('x.json')
+
+    def test_get_location(self):
+        self.assertEqual(self.db.get_location(TESTDATA), self.original.get_location(TESTDATA))
+
+    def test_entries(self):
+        self.assertEqual(
+            self.db.files[TESTDATA]['lexicon'],
+            self.original.files[TESTDATA]['lexicon']
+        )
+
+    def test_counts(self):
+        assert self.db.get_nlexemes(TESTDATA) == 4
+        assert self.db.get_ncognates(TESTDATA) == 3
+
+    def test_stats(self):
+        self.assertEqual(self.db.stats(TESTXML), self.original.stats(TESTDATA))
+
+    def test_get_lexicon(self):
+        self.assertEqual(
+            [as_tuple(r) for r in self.db.get_lexicon(TESTXML)],
+            [as_tuple(r) for r in self.original.get_lexicon(TESTDATA)]
+        )
+
+    def test_process(self):
+        assert len(self.db.process()) == 8
+
+    def test_by_word(self):
+        records = self.db.by_word(37)
+        assert len(records) == 2
+        assert all(r.Item == 'kaka' for r in records)
+        assert self.db.by_word(1000) == []
+
+    def test_cognate_set(self):
+        assert [r.ID for r in self.db.cognate_set(4, 13)] == [93340, 93340]
+        assert self.db.cognate_set(4, 1) == []
+
+    def test_by_language(self):
+        assert len(self.db.by_language(99)) == 8
+
+    def test_by_glottocode(self):
+        assert self.db.by_glottocode('neng1238') == [99, 99]
+
+    def test_glottocode_is_stripped(self):
+        entities = {
+            'language': dict(self.original.get_details(TESTDATA), glottocode=' neng1238\n'),
+            'location': None,
+            'lexicon': self.original.get_entries(TESTDATA),
+        }
+        db = SQLiteDatabase()
+        db.add('x.json', entities)
+        assert db.by_glottocode('neng1238') == [99]
+
+    def test_replace(self):
+        db = SQLiteDatabase(files=[TESTDATA])
+        db.load(TESTDATA)
+        assert len(db.files) == 1
+        assert db.get_nlexemes(TESTDATA) == 4
+
+    def test_load_many(self):
+        db = SQLiteDatabase()
+        db.load_many([TESTDATA], executor='thread')
+        self.assertEqual(list(db.files), [TESTDATA])
+        assert db.get_nlexemes(TESTDATA) == 4
+
+    def test_save_details(self):
+        with tempfile.NamedTemporaryFile() as out:
+            self.db.save_details(out.name)
+            out.seek(0)
+            assert len(out.readlines()) == 3
+
+    def test_persistent(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'abvd.sqlite')
+            SQLiteDatabase(path, files=[TESTDATA]).close()
+            db = SQLiteDatabase(path)
+            assert db.get_nlexemes(TESTDATA) == 4
+            db.close()
+        finally:
+            shutil.rmtree(tmpdir)
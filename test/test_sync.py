@@ -0,0 +1,63 @@
+import os
+import json
+import codecs
+import tempfile
+import unittest
+
+from abvd.sync import ChangeReport, diff_lexicon
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'nengone.xml')
+
+
+def lexicon(*records):
+    return {'lexicon': [dict(r) for r in records]}
+
+
+class TestDiffLexicon(unittest.TestCase):
+    def test_same(self):
+        old = lexicon({'id': '1', 'item': 'a'}, {'id': '2', 'item': 'b'})
+        self.assertEqual(diff_lexicon(old, old), {'added': 0, 'removed': 0, 'modified': 0})
+
+    def test_changes(self):
+        old = lexicon({'id': '1', 'item': 'a'}, {'id': '2', 'item': 'b'}, {'id': '3', 'item': 'c'})
+        new = lexicon({'id': '1', 'item': 'a'}, {'id': '2', 'item': 'B'}, {'id': '4', 'item': 'd'}, {'id': '5', 'item': 'e'})
+        self.assertEqual(diff_lexicon(old, new), {'added': 2, 'removed': 1, 'modified': 1})
+
+
+class TestChangeReport(unittest.TestCase):
+    def setUp(self):
+        with codecs.open(TESTDATA, 'r', encoding='utf8') as handle:
+            self.content = handle.read()
+
+    def test_report(self):
+        report = ChangeReport()
+        report.add_new(3)
+        report.add_removed(2)
+        report.add_unchanged(4)
+        report.add_changed(1, self.content, self.content.replace('<item>nin</item>', '<item>nini</item>'))
+        self.assertEqual(report.to_dict(), {
+            'new': [3],
+            'changed': {'1': {'added': 0, 'removed': 0, 'modified': 1}},
+            'removed': [2],
+            'unchanged': 1,
+        })
+        assert report.summary() == "new: 1, changed: 1, removed: 1, unchanged: 1"
+
+    def test_unparseable(self):
+        report = ChangeReport()
+        report.add_changed(1, self.content, '<record><id>1</id></record>')
+        assert 'error' in report.changed[1]
+
+    def test_truncated(self):
+        report = ChangeReport()
+        report.add_changed(1, self.content[:len(self.content) // 2], self.content)
+        assert 'error' in report.changed[1]
+        assert report.to_dict()['changed'] == {'1': report.changed[1]}
+
+    def test_save(self):
+        report = ChangeReport()
+        report.add_new(3)
+        with tempfile.NamedTemporaryFile(suffix='.json') as out:
+            report.save(out.name)
+            with open(out.name) as handle:
+                assert json.load(handle)['new'] == [3]
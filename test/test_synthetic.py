@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from abvd import ABVDatabase, Parser
+from abvd.synthetic import make_corpus, make_language, make_meanings, to_xml, write_corpus
+
+
+class TestSynthetic(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(list(make_corpus(5, 20)), list(make_corpus(5, 20)))
+        assert list(make_corpus(3, 20, seed=1)) != list(make_corpus(3, 20, seed=2))
+
+    def test_independent_of_size(self):
+        # a language is the same whichever corpus it is in.
+        self.assertEqual(list(make_corpus(10, 20))[:3], list(make_corpus(3, 20)))
+
+    def test_language(self):
+        entities = make_language(7, make_meanings(210))
+        assert entities['language']['id'] == '7'
+        assert Parser().is_language(entities['language'])
+        assert all(Parser().is_lexicon(r) for r in entities['lexicon'])
+        assert 150 < len(entities['lexicon']) < 260
+        ids = [r['id'] for r in entities['lexicon']]
+        assert len(ids) == len(set(ids))
+
+    def test_xml_roundtrip(self):
+        entities = make_language(3, make_meanings(30))
+        self.assertEqual(Parser().parse(to_xml(entities)), entities)
+        self.assertEqual(Parser().parse(to_xml(entities, wrap=False)), entities)
+
+    def test_write_corpus(self):
+        directory = tempfile.mkdtemp()
+        try:
+            files = write_corpus(directory, 4, 15, formats=('json', 'xml'))
+            self.assertEqual([os.path.basename(f) for f in files['json']], ['1.json', '2.json', '3.json', '4.json'])
+            db = ABVDatabase(files=files['json'])
+            xml = ABVDatabase.from_xml(files['xml'])
+            self.assertEqual(len(db.process()), len(xml.process()))
+        finally:
+            shutil.rmtree(directory)
@@ -5,9 +5,32 @@ __author__ = 'Simon J. Greenhill <simon@simon.net.nz>'
 __copyright__ = 'Copyright (c) 2016 Simon J. Greenhill'
 __license__ = 'New-style BSD'
 
+import random
 import unittest
+import unicodedata
 
-from abvd.tools import clean, slugify
+from abvd.tools import clean, parse_cognacy, slugify, slugify_many
+
+
+def reference_slugify(var):
+    """The original, uncompiled slugify, to check the output is unchanged."""
+    remove = ["(", ")", ";", "?", '’', "'", ".", ",", ':', "‘",]
+    replace = [
+        (" - ", '_'), (" ", "_"), ("ŋ", "ng"), ('ʝ', "j"),
+        ('ɛ', 'e'), ('ʃ', 'sh'), ('ø', 'Y'), ('ɲ', 'nj'),
+    ]
+    var = var.split("[")[0].strip()
+    var = var.split("/")[0].strip()
+    var = unicodedata.normalize('NFKD', var)
+    var = "".join([c for c in var if not unicodedata.combining(c)])
+    var = var.replace("ß", "V")  # do this before casefolding
+    var = var.casefold()
+    for r in remove:
+        var = var.replace(r, "")
+    for r in replace:
+        var = var.replace(*r)
+    var = var.title()
+    return var
 
 
 class TestClean(unittest.TestCase):
@@ -21,6 +44,27 @@ class TestClean(unittest.TestCase):
         self.assertEqual(clean("la\tng"), 'lang')
 
 
+class TestParseCognacy(unittest.TestCase):
+    def test_none(self):
+        self.assertEqual(parse_cognacy(None), [])
+        self.assertEqual(parse_cognacy(''), [])
+
+    def test_single(self):
+        self.assertEqual(parse_cognacy('1'), [('1', False)])
+
+    def test_multiple(self):
+        self.assertEqual(parse_cognacy('1,13'), [('1', False), ('13', False)])
+        self.assertEqual(parse_cognacy('1, 13'), [('1', False), ('13', False)])
+
+    def test_uncertain(self):
+        self.assertEqual(parse_cognacy('2?'), [('2', True)])
+        self.assertEqual(parse_cognacy('1,2?'), [('1', False), ('2', True)])
+
+    def test_junk(self):
+        self.assertEqual(parse_cognacy('?'), [])
+        self.assertEqual(parse_cognacy('1,,'), [('1', False)])
+
+
 class Test_Slugify(unittest.TestCase):
     def test_brackets(self):
         self.assertEqual(slugify('Banggai (W.dialect)'), 'Banggai_Wdialect')
@@ -65,3 +109,29 @@ class Test_Slugify(unittest.TestCase):
     
     def test_another_apostrophe(self):
         self.assertEqual(slugify('‘Aragur'), 'Aragur')
+
+
+class Test_SlugifyFastPath(unittest.TestCase):
+    NAMES = [
+        'Banggai (W.dialect)', 'Buru [Namrole Bay]', 'Aklanon - Bisayan',
+        'Gimán', 'Kakiduge:n Ilongot', 'Angkola / Mandailin', 'V’ënen Taut',
+        'ßatarobu', 'Bawah Ŋgusumbatu', 'xʝalasu', 'Moaekɛ', 'Ɲua', '‘Aragur',
+        'Ølsen', 'køb', 'ʃiʃi', 'a (- b', 'a -(b', 'Straße', 'ǅemal', 'ﬁji',
+        '  Nengone  ', '', 'A-B - C', "O'o", 'İnce', 'Ĳssel',
+    ]
+
+    def test_identical(self):
+        for name in self.NAMES:
+            self.assertEqual(slugify(name), reference_slugify(name), name)
+
+    def test_identical_random(self):
+        rng = random.Random(42)
+        alphabet = "aeiouAEIOU ()[];?’'.,:‘-/ßŋŊʝɛʃøØɲƝáÁëñçĳǅﬁİ\u0301"
+        for _ in range(2000):
+            name = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(slugify(name), reference_slugify(name), repr(name))
+
+    def test_many(self):
+        names = self.NAMES + self.NAMES
+        self.assertEqual(slugify_many(names), [reference_slugify(n) for n in names])
+        self.assertEqual(slugify_many(iter(['Gimán'])), ['Giman'])